@@ -0,0 +1,86 @@
+import json
+import logging
+import os
+import threading
+
+CHECKPOINT_FILE = "scrape_checkpoints.json"
+
+
+class CheckpointStore:
+    """Per query URL: the output file, the completed page offsets and the job ids
+    captured so far. An entry lives until its query has been scraped completely."""
+
+    def __init__(self, filename=CHECKPOINT_FILE, results_per_page=25):
+        self.filename = filename
+        self.results_per_page = results_per_page
+        self.lock = threading.Lock()
+        self.checkpoints = {}
+        if os.path.exists(filename):
+            with open(filename, "r") as file:
+                self.checkpoints = json.load(file)
+            logging.info(f"Loaded {len(self.checkpoints)} checkpoints from {filename}")
+        self._job_ids = {
+            query: set(checkpoint["job_ids"])
+            for query, checkpoint in self.checkpoints.items()
+        }
+
+    def get(self, query):
+        return self.checkpoints.get(query)
+
+    def start(self, query, file_name):
+        with self.lock:
+            self.checkpoints[query] = {
+                "file_name": file_name,
+                "completed_starts": [],
+                "job_ids": [],
+            }
+            self._job_ids[query] = set()
+            self._save()
+
+    def job_ids(self, query):
+        return self._job_ids.setdefault(query, set())
+
+    def add_job(self, query, job_id):
+        # Kept in memory and persisted with the page, the sink already has the job
+        with self.lock:
+            self.job_ids(query).add(job_id)
+
+    def is_page_done(self, query, page):
+        checkpoint = self.checkpoints.get(query)
+        start = (page - 1) * self.results_per_page
+        return checkpoint is not None and start in checkpoint["completed_starts"]
+
+    def first_pending_page(self, query):
+        page = 1
+        while self.is_page_done(query, page):
+            page += 1
+        return page
+
+    def pending_pages(self, query, total_pages):
+        return [
+            page
+            for page in range(1, total_pages + 1)
+            if not self.is_page_done(query, page)
+        ]
+
+    def complete_page(self, query, page):
+        with self.lock:
+            checkpoint = self.checkpoints[query]
+            checkpoint["completed_starts"] = sorted(
+                set(checkpoint["completed_starts"])
+                | {(page - 1) * self.results_per_page}
+            )
+            checkpoint["job_ids"] = sorted(self.job_ids(query))
+            self._save()
+
+    def finish(self, query):
+        with self.lock:
+            self.checkpoints.pop(query, None)
+            self._job_ids.pop(query, None)
+            self._save()
+
+    def _save(self):
+        tmp_filename = f"{self.filename}.tmp"
+        with open(tmp_filename, "w") as file:
+            json.dump(self.checkpoints, file)
+        os.replace(tmp_filename, self.filename)
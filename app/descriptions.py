@@ -0,0 +1,153 @@
+import re
+
+# Section headings by kind, tried in order; "role" sections are what the skills
+# are extracted from, the others are cut down by SECTION_LIMITS. "role" comes
+# early so a requirement bullet that mentions e.g. a salary does not end the section
+SECTION_PATTERNS = [
+    (
+        "legal",
+        re.compile(
+            r"\beeo\b|equal (employment )?opportunit|accommodation|posting statement"
+            r"|disclaimer|privacy|e-verify|background check",
+            re.I,
+        ),
+    ),
+    (
+        "role",
+        re.compile(
+            r"responsibilit|requirement|qualification|skills|experience|duties"
+            r"|what you|you will|you'll|you’ll|you have|you bring|about you"
+            r"|about the (role|job|position|team|opportunity)|the role|role overview"
+            r"|job (description|summary|details)|position summary|must have"
+            r"|nice to have|preferred|education|looking for|tech stack|technolog"
+            r"|what we need|opportunit|your impact|the position|(?<!company )overview",
+            re.I,
+        ),
+    ),
+    (
+        "benefits",
+        re.compile(
+            r"benefit|perks|(we|to) offer|rewards|compensation|pay range|salary"
+            r"|why join|why work|parental leave|time off|schedule",
+            re.I,
+        ),
+    ),
+    (
+        "company",
+        re.compile(
+            r"^about\b|^why\b|who we are|company (description|overview)"
+            r"|our (company|mission|culture|story|values)",
+            re.I,
+        ),
+    ),
+]
+# Characters kept per section kind; kinds not listed are kept whole
+SECTION_LIMITS = {"intro": 1000, "company": 0, "benefits": 0, "legal": 0}
+# Below this share of the posting kept, the sections were likely misread and the
+# whole description is used instead
+MIN_KEPT = 0.5
+# Bullets or requirement wording; a section with these is kept whatever its
+# heading, as postings put requirements under "About <company>" or in the intro
+REQUIREMENT_RE = re.compile(
+    r"^\s*(?:[-•·*▪◦●–]|\d+[.)])\s"
+    r"|\b(?:experience (?:with|in)|years of|proficien|knowledge of|familiar"
+    r"|hands-on|degree in|ability to|understanding of|expertise in)",
+    re.I | re.M,
+)
+
+BOILERPLATE_RE = re.compile(r"^\s*About the job\s*", re.I)
+SPACES_RE = re.compile(r"[^\S\n]+")
+BLANK_LINES_RE = re.compile(r"\s*\n\s*")
+# A short line on its own, or a few capitalized words glued to the end of a
+# sentence, as LinkedIn often loses the line breaks ("...work.About Company:Commerce"
+# or "...drinks.Employee BenefitsCompetitive")
+LINE_HEADING_RE = re.compile(r"^([^\n.!?]{3,60}?):?$", re.M)
+INLINE_HEADING_RE = re.compile(
+    r"(?<=[a-z.!?)])([A-Z][A-Za-z'’&]*(?: [A-Za-z'’&]+){0,5})(?::|(?=[A-Z][a-z]))"
+)
+# Roughly one token per word or punctuation mark; close enough to compare prompts
+TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def count_tokens(text):
+    return len(TOKEN_RE.findall(text or ""))
+
+
+def normalize_whitespace(text):
+    text = BOILERPLATE_RE.sub("", text or "")
+    text = SPACES_RE.sub(" ", text)
+    return BLANK_LINES_RE.sub("\n", text).strip()
+
+
+def section_kind(heading):
+    for kind, pattern in SECTION_PATTERNS:
+        if pattern.search(heading):
+            return kind
+    return None
+
+
+def split_sections(text):
+    """Split a normalized description into (kind, text) sections at recognized
+    headings. Text before the first heading is the "intro"."""
+    headings = []
+    for regex in (LINE_HEADING_RE, INLINE_HEADING_RE):
+        for match in regex.finditer(text):
+            kind = section_kind(match.group(1).strip())
+            if kind:
+                headings.append((match.start(), kind))
+    headings.sort()
+
+    sections = []
+    start, kind = 0, "intro"
+    for position, next_kind in headings:
+        if position > start:
+            sections.append((kind, text[start:position]))
+        start, kind = position, next_kind
+    sections.append((kind, text[start:]))
+    return sections
+
+
+def truncate(text, limit):
+    """Cut text to at most limit characters, at a sentence end where possible."""
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    end = max(cut.rfind(". "), cut.rfind(".\n"), cut.rfind("\n"))
+    return cut[: end + 1] if end > 0 else cut
+
+
+def prepare_description(text, limits=SECTION_LIMITS):
+    """Strip boilerplate and whitespace runs, and drop or shorten the sections that
+    do not describe the role (company blurb, benefits, legal text). Sections with
+    bullets or requirement wording are kept, and when less than MIN_KEPT of the
+    text would remain the whole normalized description is returned."""
+    text = normalize_whitespace(text)
+    sections = split_sections(text)
+    has_role_section = any(kind == "role" for kind, _ in sections)
+
+    kept = []
+    for kind, section in sections:
+        limit = limits.get(kind)
+        # Without recognized headings the intro is the whole posting
+        if kind == "intro" and not has_role_section:
+            limit = None
+        if kind != "legal" and REQUIREMENT_RE.search(section):
+            limit = None
+        if limit is not None:
+            section = truncate(section, limit)
+        section = section.strip()
+        if section:
+            kept.append(section)
+    prepared = "\n".join(kept)
+    if len(prepared) < MIN_KEPT * len(text):
+        return text
+    return prepared
+
+
+def prepare_descriptions(descriptions, limits=SECTION_LIMITS):
+    """Prepare a Series of descriptions; returns the prepared Series and the total
+    token counts before and after."""
+    prepared = descriptions.map(lambda text: prepare_description(text, limits))
+    before = int(descriptions.map(count_tokens).sum())
+    after = int(prepared.map(count_tokens).sum())
+    return prepared, before, after
@@ -0,0 +1,104 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from bs4 import BeautifulSoup, SoupStrainer
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+FETCH_CONCURRENCY = 4
+FETCH_TIMEOUT = 15
+
+
+def parse_job_description(page_source, site):
+    """Extract the description text from a job detail page."""
+    for description_class in site.description_classes:
+        only_description = SoupStrainer(class_=description_class)
+        page = BeautifulSoup(page_source, site.html_parser, parse_only=only_description)
+        description_element = page.find(class_=description_class)
+        if description_element is not None:
+            text = description_element.get_text("\n", strip=True)
+            if text:
+                return text
+    return None
+
+
+class DescriptionFetcher:
+    """Fetches job detail pages over a pooled HTTP session instead of the browser."""
+
+    def __init__(
+        self,
+        site,
+        cookies=(),
+        user_agent=None,
+        concurrency=FETCH_CONCURRENCY,
+        timeout=FETCH_TIMEOUT,
+    ):
+        self.site = site
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        retries = Retry(
+            total=3,
+            backoff_factor=1,
+            status_forcelist=[429, 500, 502, 503, 504],
+            respect_retry_after_header=True,
+        )
+        adapter = HTTPAdapter(pool_maxsize=concurrency, max_retries=retries)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        if user_agent:
+            self.session.headers["User-Agent"] = user_agent
+        for cookie in cookies:
+            self.session.cookies.set(
+                cookie["name"],
+                cookie["value"],
+                domain=cookie.get("domain", ""),
+                path=cookie.get("path", "/"),
+            )
+
+        # The semaphore bounds requests in flight even when several scraper
+        # threads call fetch_description directly
+        self.semaphore = threading.BoundedSemaphore(concurrency)
+        self.executor = ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="fetch"
+        )
+
+    @classmethod
+    def from_driver(cls, driver, site, **kwargs):
+        """Reuse the cookies and user agent of a logged-in browser session."""
+        return cls(
+            site,
+            cookies=driver.get_cookies(),
+            user_agent=driver.execute_script("return navigator.userAgent"),
+            **kwargs,
+        )
+
+    def fetch_description(self, job_id):
+        url = self.site.job_view_url.format(job_id=job_id)
+        with self.semaphore:
+            response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        return parse_job_description(response.text, self.site)
+
+    def fetch_descriptions(self, job_ids):
+        """Yield (job_id, description) pairs in completion order.
+
+        description is None when the page could not be fetched or parsed.
+        """
+        futures = {
+            self.executor.submit(self.fetch_description, job_id): job_id
+            for job_id in job_ids
+        }
+        for future in as_completed(futures):
+            job_id = futures[future]
+            try:
+                yield job_id, future.result()
+            except requests.RequestException as e:
+                logging.error(f"Failed to fetch description for job {job_id}: {e}")
+                yield job_id, None
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.session.close()
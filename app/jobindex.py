@@ -0,0 +1,395 @@
+import argparse
+import hashlib
+import logging
+import math
+import re
+import sqlite3
+import threading
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from sources import find_bronze_files, load_bronze_file
+
+JOB_INDEX_FILE = "job_index.sqlite"
+# Indexed fields in position order; a phrase never spans two of them
+INDEXED_FIELDS = ["job_title", "company_name", "location", "job_description"]
+# Scraper records use the short names of jobsink.JOB_FIELDS
+SCRAPER_FIELDS = {
+    "id": "job_id",
+    "title": "job_title",
+    "link": "job_link",
+    "description": "job_description",
+}
+K1 = 1.2
+B = 0.75
+TOP_RESULTS = 10
+
+# Keeps "c++" and "c#" whole; "ci/cd" or "dbt-core" are split, and the same split
+# of a query word makes it a phrase
+TOKEN_RE = re.compile(r"\w[\w+#]*")
+QUERY_RE = re.compile(r'\s*(?:(-)?"([^"]*)"?|([()])|(-)?([^\s()"]+))')
+
+
+def tokenize(text):
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    return TOKEN_RE.findall(text)
+
+
+def conform_job(job):
+    """A scraper record or a conformed bronze row, with the conformed names and
+    missing values (NaN from pandas) as None."""
+    return {
+        SCRAPER_FIELDS.get(key, key): value if isinstance(value, str) else None
+        for key, value in dict(job).items()
+    }
+
+
+def parse_query(query):
+    """Parse a query into a tree of ("or", [...]), ("and", [...]), ("not", node)
+    and ("terms", [tokens]) nodes.
+
+    Words are ANDed unless joined by OR; NOT or a leading "-" excludes, quotes
+    make a phrase and parentheses group: 'dbt (airflow OR dagster) -"entry level"'.
+    """
+    tokens = []
+    position = 0
+    query = query.strip()
+    while position < len(query):
+        match = QUERY_RE.match(query, position)
+        position = match.end()
+        negated_phrase, phrase, paren, negated_word, word = match.groups()
+        if paren:
+            tokens.append(paren)
+        elif word in ("AND", "OR", "NOT"):
+            tokens.append(word)
+        elif phrase is not None or word:
+            terms = tokenize(word if phrase is None else phrase)
+            # Punctuation such as "&" or a bare "-" has no tokens to match
+            if not terms:
+                continue
+            if negated_phrase or negated_word:
+                tokens.append("NOT")
+            tokens.append(("terms", terms))
+    tree, rest = _parse_or(tokens)
+    if rest:
+        raise ValueError(f"Unexpected {rest[0]!r} in query {query!r}")
+    return tree
+
+
+def _parse_or(tokens):
+    children = []
+    while True:
+        child, tokens = _parse_and(tokens)
+        children.append(child)
+        if not tokens or tokens[0] != "OR":
+            break
+        tokens = tokens[1:]
+    return (children[0] if len(children) == 1 else ("or", children)), tokens
+
+
+def _parse_and(tokens):
+    children = []
+    while tokens and tokens[0] not in ("OR", ")"):
+        if tokens[0] == "AND":
+            tokens = tokens[1:]
+            continue
+        child, tokens = _parse_unary(tokens)
+        children.append(child)
+    if not children:
+        raise ValueError("Empty query or group")
+    return (children[0] if len(children) == 1 else ("and", children)), tokens
+
+
+def _parse_unary(tokens):
+    token, tokens = tokens[0], tokens[1:]
+    if token == "NOT":
+        if not tokens or tokens[0] in ("AND", "OR", ")"):
+            raise ValueError("NOT without a term to exclude in query")
+        child, tokens = _parse_unary(tokens)
+        return ("not", child), tokens
+    if token == "(":
+        child, tokens = _parse_or(tokens)
+        if not tokens or tokens[0] != ")":
+            raise ValueError("Unclosed parenthesis in query")
+        return child, tokens[1:]
+    if token == ")":
+        raise ValueError("Unmatched parenthesis in query")
+    return token, tokens
+
+
+def scored_terms(node):
+    """The terms BM25 ranks by: all of them except the excluded ones."""
+    kind, value = node
+    if kind == "terms":
+        return list(value)
+    if kind == "not":
+        return []
+    return [term for child in value for term in scored_terms(child)]
+
+
+class JobIndex:
+    """Persistent positional inverted index over the scraped postings.
+
+    Postings are added one at a time as they are scraped (or in bulk from the
+    bronze files) and committed per page; a job_id seen again is re-indexed only
+    when its content changed. Queries read just the posting lists of their terms.
+    """
+
+    def __init__(self, filename=JOB_INDEX_FILE):
+        self.filename = filename
+        self.lock = threading.Lock()
+        # Shared by the scraper workers, every access goes through the lock
+        self.connection = sqlite3.connect(filename, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS docs (
+                doc_id INTEGER PRIMARY KEY,
+                job_id TEXT NOT NULL UNIQUE,
+                content_hash TEXT NOT NULL,
+                length INTEGER NOT NULL,
+                job_title TEXT,
+                company_name TEXT,
+                location TEXT,
+                job_link TEXT
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL,
+                doc_id INTEGER NOT NULL,
+                tf INTEGER NOT NULL,
+                positions BLOB NOT NULL,
+                PRIMARY KEY (term, doc_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id);
+            """
+        )
+        self.connection.commit()
+        self._lengths = None
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def add(self, job):
+        """Index a posting; returns False when it is already indexed as is."""
+        job = conform_job(job)
+        fields = [job.get(field) or "" for field in INDEXED_FIELDS]
+        content_hash = hashlib.sha1("\x1f".join(fields).encode("utf-8")).hexdigest()
+
+        positions = {}
+        position = 0
+        for text in fields:
+            for token in tokenize(text):
+                positions.setdefault(token, []).append(position)
+                position += 1
+            position += 1  # keeps phrases from running across fields
+
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT doc_id, content_hash FROM docs WHERE job_id = ?",
+                (job["job_id"],),
+            ).fetchone()
+            if row and row[1] == content_hash:
+                return False
+            if row:
+                self.connection.execute(
+                    "DELETE FROM postings WHERE doc_id = ?", (row[0],)
+                )
+                self.connection.execute("DELETE FROM docs WHERE doc_id = ?", (row[0],))
+                if self._lengths is not None:
+                    self._lengths.pop(row[0], None)
+            doc_id = self.connection.execute(
+                """
+                INSERT INTO docs (job_id, content_hash, length, job_title,
+                                  company_name, location, job_link)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    job["job_id"],
+                    content_hash,
+                    position,
+                    job.get("job_title"),
+                    job.get("company_name"),
+                    job.get("location"),
+                    job.get("job_link"),
+                ),
+            ).lastrowid
+            self.connection.executemany(
+                "INSERT INTO postings VALUES (?, ?, ?, ?)",
+                [
+                    (term, doc_id, len(offsets), np.array(offsets, np.uint32).tobytes())
+                    for term, offsets in positions.items()
+                ],
+            )
+            if self._lengths is not None:
+                self._lengths[doc_id] = position
+        return True
+
+    def add_jobs(self, jobs):
+        """Index the rows of a conformed jobs frame; returns how many changed."""
+        jobs = jobs.dropna(subset=["job_id"]).astype({"job_id": str})
+        added = sum(self.add(job) for job in jobs.to_dict("records"))
+        self.commit()
+        return added
+
+    def commit(self):
+        # Called once per page rather than per job
+        with self.lock:
+            self.connection.commit()
+
+    def close(self):
+        self.commit()
+        with self.lock:
+            self.connection.close()
+        logging.info(f"Closed job index {self.filename}")
+
+    @property
+    def lengths(self):
+        """Token count per doc_id, read once and kept up to date by add."""
+        if self._lengths is None:
+            with self.lock:
+                self._lengths = dict(
+                    self.connection.execute("SELECT doc_id, length FROM docs")
+                )
+        return self._lengths
+
+    def _postings(self, term, cache):
+        """{doc_id: (tf, positions blob)} for a term, read once per query."""
+        if term not in cache:
+            with self.lock:
+                cache[term] = {
+                    doc_id: (tf, positions)
+                    for doc_id, tf, positions in self.connection.execute(
+                        "SELECT doc_id, tf, positions FROM postings WHERE term = ?",
+                        (term,),
+                    )
+                }
+        return cache[term]
+
+    def _match_terms(self, terms, cache):
+        """Documents containing the terms as a phrase (a single term: anywhere)."""
+        if not terms:
+            return set()
+        postings = [self._postings(term, cache) for term in terms]
+        docs = set.intersection(*(set(p) for p in postings))
+        if len(terms) == 1:
+            return docs
+        matched = set()
+        for doc_id in docs:
+            # Shift each term's positions back by its offset in the phrase; a
+            # position left in every set is where the phrase starts
+            starts = None
+            for offset, term_postings in enumerate(postings):
+                positions = np.frombuffer(term_postings[doc_id][1], np.uint32)
+                shifted = positions.astype(np.int64) - offset
+                starts = shifted if starts is None else np.intersect1d(starts, shifted)
+                if not len(starts):
+                    break
+            if len(starts):
+                matched.add(doc_id)
+        return matched
+
+    def _evaluate(self, node, cache):
+        kind, value = node
+        if kind == "terms":
+            return self._match_terms(value, cache)
+        if kind == "or":
+            return set().union(*(self._evaluate(child, cache) for child in value))
+        if kind == "not":
+            return set(self.lengths) - self._evaluate(value, cache)
+        included = [child for child in value if child[0] != "not"]
+        excluded = [child[1] for child in value if child[0] == "not"]
+        docs = (
+            set.intersection(*(self._evaluate(child, cache) for child in included))
+            if included
+            else set(self.lengths)
+        )
+        for child in excluded:
+            docs -= self._evaluate(child, cache)
+        return docs
+
+    def search(self, query, top=TOP_RESULTS):
+        """Postings matching a boolean/phrase query, ranked by BM25 over its terms.
+
+        Returns a frame of job_id, score, job_title, company_name, location and
+        job_link, best first; top=None returns every match.
+        """
+        tree = parse_query(query)
+        cache = {}
+        docs = self._evaluate(tree, cache)
+        lengths = self.lengths
+        if not docs or not lengths:
+            return pd.DataFrame(
+                columns=["job_id", "score", *INDEXED_FIELDS[:-1], "job_link"]
+            )
+
+        average_length = sum(lengths.values()) / len(lengths)
+        scores = dict.fromkeys(docs, 0.0)
+        for term in set(scored_terms(tree)):
+            postings = self._postings(term, cache)
+            idf = math.log(
+                1 + (len(lengths) - len(postings) + 0.5) / (len(postings) + 0.5)
+            )
+            for doc_id in docs & postings.keys():
+                tf = postings[doc_id][0]
+                norm = K1 * (1 - B + B * lengths[doc_id] / average_length)
+                scores[doc_id] += idf * tf * (K1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: -item[1])[:top]
+        with self.lock:
+            rows = {
+                row[0]: row[1:]
+                for doc_id, _ in ranked
+                for row in self.connection.execute(
+                    """
+                    SELECT doc_id, job_id, job_title, company_name, location, job_link
+                    FROM docs WHERE doc_id = ?
+                    """,
+                    (doc_id,),
+                )
+            }
+        return pd.DataFrame(
+            [(rows[doc_id][0], score, *rows[doc_id][1:]) for doc_id, score in ranked],
+            columns=["job_id", "score", *INDEXED_FIELDS[:-1], "job_link"],
+        )
+
+
+def index_bronze(job_index, bronze_directory):
+    """Add every posting of the bronze files to the index."""
+    for path in find_bronze_files(bronze_directory):
+        try:
+            _, _, jobs = load_bronze_file(path)
+        except ValueError as e:
+            logging.warning(f"Skipping {path}: {e}")
+            continue
+        added = job_index.add_jobs(jobs)
+        logging.info(f"Indexed {added} new or changed jobs from {path}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(
+        description="Search the scraped jobs, e.g. 'dbt (airflow OR dagster) -\"entry level\"'."
+    )
+    parser.add_argument("query", nargs="?")
+    parser.add_argument("--index", default=JOB_INDEX_FILE)
+    parser.add_argument("--top", type=int, default=TOP_RESULTS)
+    parser.add_argument(
+        "--bronze", metavar="DIRECTORY", help="index the bronze files first"
+    )
+    args = parser.parse_args()
+
+    job_index = JobIndex(args.index)
+    if args.bronze:
+        index_bronze(job_index, args.bronze)
+    if args.query:
+        try:
+            results = job_index.search(args.query, args.top)
+        except ValueError as e:
+            job_index.close()
+            parser.error(str(e))
+        print(results.drop(columns=["job_link"]).to_string(index=False))
+    job_index.close()
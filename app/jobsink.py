@@ -0,0 +1,147 @@
+import csv
+import json
+import logging
+import os
+
+JOB_FIELDS = ["title", "company_name", "location", "link", "id", "description"]
+FSYNC_EVERY = 25  # one search results page
+
+
+class JobSink:
+    """Append-only job writer; subclasses implement the on-disk record format."""
+
+    def __init__(self, filename, fsync_every=FSYNC_EVERY, append=False):
+        self.filename = filename
+        self.fsync_every = fsync_every
+        self.count = 0
+        self._unsynced = 0
+
+        directory = os.path.dirname(filename)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        if not append and os.path.exists(filename) and os.path.getsize(filename):
+            # Leftover from a run that died before finalize; keep it around
+            backup = f"{filename}.bak"
+            logging.warning(f"Moving stale {filename} to {backup}")
+            os.replace(filename, backup)
+
+        self.file = open(filename, "a", newline="", encoding="utf-8")
+        self._open()
+
+    def _open(self):
+        pass
+
+    def _write_record(self, job):
+        raise NotImplementedError
+
+    def read_records(self):
+        raise NotImplementedError
+
+    def write(self, job):
+        self._write_record(job)
+        self.count += 1
+        self._unsynced += 1
+        # flush() hands the record to the OS so a crashed process loses nothing;
+        # fsync() is what survives a power loss, and is the expensive part
+        self.file.flush()
+        if self.fsync_every and self._unsynced >= self.fsync_every:
+            self.sync()
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self._unsynced = 0
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.sync()
+        self.file.close()
+
+    def finalize(self, output, keep=False):
+        """Write all records as a single JSON array, the format save_file produced.
+
+        The appended file is removed afterwards unless keep is set, e.g. when the
+        scrape is incomplete and a later run will append to it again.
+        """
+        self.close()
+        write_json_atomic(list(self.read_records()), output)
+        logging.info(f"Finalized {self.count} jobs from {self.filename} into {output}")
+        if not keep:
+            os.remove(self.filename)
+        return output
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class JsonLinesSink(JobSink):
+    def _write_record(self, job):
+        self.file.write(json.dumps(job, ensure_ascii=False) + "\n")
+
+    def read_records(self):
+        with open(self.filename, "r", encoding="utf-8") as file:
+            for line in file:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn last line from a crash; everything before it is intact
+                    logging.warning(f"Skipping truncated record in {self.filename}")
+
+
+class CsvSink(JobSink):
+    def __init__(self, filename, fieldnames=JOB_FIELDS, **kwargs):
+        self.fieldnames = fieldnames
+        super().__init__(filename, **kwargs)
+
+    def _open(self):
+        self.writer = csv.DictWriter(
+            self.file, fieldnames=self.fieldnames, extrasaction="ignore"
+        )
+        if self.file.tell() == 0:
+            self.writer.writeheader()
+
+    def _write_record(self, job):
+        self.writer.writerow(job)
+
+    def read_records(self):
+        with open(self.filename, "r", newline="", encoding="utf-8") as file:
+            yield from csv.DictReader(file)
+
+
+SINKS = {
+    "jsonl": JsonLinesSink,
+    "csv": CsvSink,
+}
+
+
+def open_sink(filename, **kwargs):
+    file_format = filename.split(".")[-1]
+    if file_format not in SINKS:
+        raise ValueError(f"Unsupported sink format: {file_format}")
+    return SINKS[file_format](filename, **kwargs)
+
+
+def staging_filename(filename):
+    """JSON output is staged as JSON Lines next to the final file."""
+    return os.path.splitext(filename)[0] + ".jsonl"
+
+
+def write_json_atomic(data, filename):
+    directory = os.path.dirname(filename)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+
+    tmp_filename = f"{filename}.tmp"
+    with open(tmp_filename, "w", encoding="utf-8") as file:
+        json.dump(data, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_filename, filename)
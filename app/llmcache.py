@@ -0,0 +1,132 @@
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+
+LLM_CACHE_FILE = "llm_cache.sqlite"
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+
+def normalize_description(description):
+    """Collapse whitespace, so reformatted copies of a posting share a cache entry."""
+    return re.sub(r"\s+", " ", description or "").strip()
+
+
+def cache_key(description, prompt, model, temperature):
+    """prompt is the full prompt with the description left out."""
+    content = "\x1f".join(
+        [normalize_description(description), prompt, model, repr(temperature)]
+    )
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """On-disk cache of parsed extraction results, evicting the least recently
+    used entries once the stored values exceed max_bytes."""
+
+    def __init__(self, filename=LLM_CACHE_FILE, max_bytes=MAX_CACHE_BYTES):
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        # Shared by the extraction threads, every access goes through the lock
+        self.connection = sqlite3.connect(filename, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            ) WITHOUT ROWID
+            """
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache (last_used)"
+        )
+        self.connection.commit()
+        self.size = self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM llm_cache"
+        ).fetchone()[0]
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    def get(self, key):
+        """The cached value for key, or None."""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT value FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.connection.execute(
+                "UPDATE llm_cache SET last_used = ? WHERE key = ?", (time.time(), key)
+            )
+            self.connection.commit()
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        value = json.dumps(value)
+        size = len(value.encode("utf-8"))
+        with self.lock:
+            previous = self.connection.execute(
+                "SELECT size FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            self.connection.execute(
+                """
+                INSERT INTO llm_cache (key, value, size, last_used) VALUES (?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    value = excluded.value,
+                    size = excluded.size,
+                    last_used = excluded.last_used
+                """,
+                (key, value, size, time.time()),
+            )
+            self.size += size - (previous[0] if previous else 0)
+            self._evict()
+            self.connection.commit()
+
+    def _evict(self):
+        while self.size > self.max_bytes:
+            rows = self.connection.execute(
+                "SELECT key, size FROM llm_cache ORDER BY last_used LIMIT 100"
+            ).fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                if self.size <= self.max_bytes:
+                    break
+                self.connection.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self.size -= size
+                self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "bytes": self.size,
+        }
+
+    def close(self):
+        stats = self.stats()
+        with self.lock:
+            self.connection.close()
+        logging.info(
+            f"Closed LLM cache {self.filename}: {stats['hits']} hits, "
+            f"{stats['misses']} misses ({stats['hit_rate']:.0%}), "
+            f"{stats['evictions']} evicted, {stats['bytes']} bytes"
+        )
@@ -0,0 +1,154 @@
+import hashlib
+import logging
+import re
+import sqlite3
+import zlib
+
+import numpy as np
+
+NEARDUPS_FILE = "_minhash.sqlite"
+SHINGLE_SIZE = 5  # words per shingle
+NUM_PERM = 128
+BANDS = 16  # NUM_PERM / BANDS rows per band; candidates from about 0.7 similarity
+THRESHOLD = 0.8  # estimated Jaccard similarity for two postings to be duplicates
+
+WORD_RE = re.compile(r"\w+")
+
+_random = np.random.RandomState(20231220)  # fixed, signatures are stored on disk
+# Multiply-shift hashing: odd 64-bit multipliers, results are the top 32 bits
+PERM_A = _random.randint(0, 2**63, NUM_PERM, dtype=np.uint64) * np.uint64(2)
+PERM_A += np.uint64(1)
+PERM_B = _random.randint(0, 2**63, NUM_PERM, dtype=np.uint64)
+
+
+def shingles(text):
+    """crc32 hashes of the overlapping word n-grams of a description."""
+    words = WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        words = words + [""] * (SHINGLE_SIZE - len(words))
+    return np.fromiter(
+        (
+            zlib.crc32(" ".join(words[i : i + SHINGLE_SIZE]).encode("utf-8"))
+            for i in range(len(words) - SHINGLE_SIZE + 1)
+        ),
+        dtype=np.uint64,
+    )
+
+
+def minhash(text):
+    hashes = shingles(text)
+    with np.errstate(over="ignore"):
+        permuted = PERM_A[:, None] * hashes[None, :] + PERM_B[:, None]
+    return (permuted >> np.uint64(32)).min(axis=1).astype(np.uint32)
+
+
+def band_keys(signature):
+    """One bucket key per band; postings sharing any key are candidates."""
+    return [
+        int.from_bytes(
+            hashlib.blake2b(band.tobytes(), digest_size=8).digest(), "big", signed=True
+        )
+        for band in np.split(signature, BANDS)
+    ]
+
+
+def similarity(signature, other):
+    return float(np.mean(signature == other))
+
+
+class NearDuplicateIndex:
+    """Persistent MinHash LSH index assigning each job_id a near-duplicate cluster.
+
+    A new posting joins the cluster of its most similar indexed posting above the
+    threshold, or starts its own cluster (named after its job_id). Lookups only
+    touch the LSH buckets of the posting, so adding postings stays cheap as the
+    index grows. Clusters are never merged, so cluster ids stay stable.
+    """
+
+    def __init__(self, filename, threshold=THRESHOLD):
+        self.filename = filename
+        self.threshold = threshold
+        self.connection = sqlite3.connect(filename)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS signatures (
+                job_id TEXT PRIMARY KEY,
+                signature BLOB NOT NULL,
+                cluster_id TEXT NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS buckets (
+                band INTEGER NOT NULL,
+                key INTEGER NOT NULL,
+                job_id TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS buckets_key ON buckets (band, key);
+            """
+        )
+
+    def cluster_of(self, job_id):
+        row = self.connection.execute(
+            "SELECT cluster_id FROM signatures WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def add(self, job_id, description):
+        """Index a posting and return its cluster id; known job_ids keep theirs."""
+        cluster_id = self.cluster_of(job_id)
+        if cluster_id is not None:
+            return cluster_id
+        if not isinstance(description, str) or not WORD_RE.search(description):
+            # Nothing to compare; indexed without buckets so it is not redone
+            self.connection.execute(
+                "INSERT INTO signatures VALUES (?, ?, ?)", (job_id, b"", job_id)
+            )
+            return job_id
+
+        signature = minhash(description)
+        keys = band_keys(signature)
+        candidates = set()
+        for band, key in enumerate(keys):
+            candidates.update(
+                row[0]
+                for row in self.connection.execute(
+                    "SELECT job_id FROM buckets WHERE band = ? AND key = ?", (band, key)
+                )
+            )
+
+        best_score, cluster_id = 0.0, job_id
+        for candidate in candidates:
+            other, other_cluster = self.connection.execute(
+                "SELECT signature, cluster_id FROM signatures WHERE job_id = ?",
+                (candidate,),
+            ).fetchone()
+            score = similarity(signature, np.frombuffer(other, dtype=np.uint32))
+            if score >= self.threshold and score > best_score:
+                best_score, cluster_id = score, other_cluster
+
+        self.connection.execute(
+            "INSERT INTO signatures VALUES (?, ?, ?)",
+            (job_id, signature.tobytes(), cluster_id),
+        )
+        self.connection.executemany(
+            "INSERT INTO buckets (band, key, job_id) VALUES (?, ?, ?)",
+            [(band, key, job_id) for band, key in enumerate(keys)],
+        )
+        return cluster_id
+
+    def assign(self, jobs):
+        """Cluster ids for a DataFrame with job_id and job_description columns."""
+        cluster_ids = [
+            self.add(str(job_id), description)
+            for job_id, description in zip(jobs["job_id"], jobs["job_description"])
+        ]
+        self.connection.commit()
+        duplicates = sum(
+            cluster_id != str(job_id)
+            for job_id, cluster_id in zip(jobs["job_id"], cluster_ids)
+        )
+        logging.info(f"{duplicates} of {len(jobs)} postings are near-duplicates")
+        return cluster_ids
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
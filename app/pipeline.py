@@ -0,0 +1,367 @@
+import argparse
+import ast
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+from datetime import date, datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from neardups import NEARDUPS_FILE, NearDuplicateIndex
+from salaries import geo_of, parse_salaries, salary_percentiles, seniority_of
+from salaryindex import SALARY_INDEX_COLUMNS, SALARY_INDEX_FILE, SalaryIndex
+from sources import BRONZE_DIRECTORY, find_bronze_files, load_bronze_file
+
+SILVER_DIRECTORY = "./data/silver"
+MANIFEST_FILE = "_manifest.json"
+SALARY_PERCENTILES_FILE = "salary_percentiles.parquet"
+# Hive-style Parquet datasets: <dataset>/role=<role>/source=<source>/scrape_date=<date>/
+JOBS_DATASET = "jobs"
+SKILLS_DATASET = "skills"
+PARTITION_COLUMNS = ["source", "scrape_date"]
+
+SKILLS_TYPE = pa.list_(
+    pa.struct([("name", pa.string()), ("reference_text", pa.string())])
+)
+
+# How a bronze path maps onto a role partition, tried in order against the path
+# relative to the bronze folder
+PARTITION_RULES = [
+    re.compile(r"linkedin-jobs-scraper-(?P<role>.+?)_\d{4}-\d{2}-\d{2}"),
+    re.compile(r"^apify/indeed/(?P<role>[^/]+)/"),
+    re.compile(r"^marco_script/linkedin/(?P<role>[^/]+)/"),
+    re.compile(r"^marco_script/old/linkedin_jobs_(?P<role>.+?)_[a-z]+_\d+\.csv$"),
+    # scrapejobs.py output: <keywords>_<Location>.json
+    re.compile(r"^marco_script/(?P<role>[a-z_]+?)_[A-Z][^/]*\.json$"),
+]
+DEFAULT_PARTITION = "other"
+
+
+def slugify(value):
+    return re.sub(r"[^a-z0-9]+", "_", value.lower()).strip("_")
+
+
+def partition_of(path, bronze_directory=BRONZE_DIRECTORY):
+    relative_path = os.path.relpath(path, bronze_directory).replace(os.sep, "/")
+    for rule in PARTITION_RULES:
+        match = rule.search(relative_path)
+        if match:
+            return slugify(match.group("role"))
+    return DEFAULT_PARTITION
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def scrape_date_of(path):
+    """The date in the file name (Apify exports), else the file's modification date."""
+    match = re.search(r"\d{4}-\d{2}-\d{2}", os.path.basename(path))
+    if match:
+        return match.group()
+    return date.fromtimestamp(os.stat(path).st_mtime).isoformat()
+
+
+def parse_skills(value):
+    """Normalize an extracted skills value to a list of {name, reference_text} dicts.
+
+    Accepts the pydantic dump ({"skills": [...]}), a bare list, or either of those
+    serialized as JSON or as a Python repr string.
+    """
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return []
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            value = ast.literal_eval(value)
+    if isinstance(value, dict):
+        value = value.get("skills", [])
+    return [
+        {"name": skill.get("name"), "reference_text": skill.get("reference_text")}
+        for skill in value
+    ]
+
+
+def column_type(column, series):
+    if column == "skills":
+        return SKILLS_TYPE
+    if pd.api.types.is_float_dtype(series):
+        return pa.float64()
+    return pa.string()
+
+
+def silver_schema(df):
+    """Strings throughout, except the nested skills column and numeric columns."""
+    return pa.schema([(column, column_type(column, df[column])) for column in df.columns])
+
+
+def restore_role_partition(dataset_directory, role):
+    """Move role=<role>.old back into place if a write stopped between its two
+    renames, leaving only the old partition."""
+    role_directory = os.path.join(dataset_directory, f"role={role}")
+    old_directory = f"{role_directory}.old"
+    if not os.path.exists(role_directory) and os.path.exists(old_directory):
+        logging.warning(f"Restoring {role_directory} from an interrupted write")
+        os.replace(old_directory, role_directory)
+    return role_directory
+
+
+def write_role_partition(df, dataset_directory, role):
+    """Replace the role=<role> partition of a dataset with df, partitioned by
+    source and scrape date.
+
+    The new partition is written aside and swapped in with two renames, so
+    readers see the old or the new partition, except for the moment between
+    the renames when there is none. If a write stops there, the next one
+    restores the old partition first.
+    """
+    restore_role_partition(dataset_directory, role)
+    df = df.copy()
+    for column in df.columns:
+        if column == "skills":
+            df[column] = df[column].map(parse_skills)
+        elif not pd.api.types.is_float_dtype(df[column]):
+            df[column] = df[column].astype("string")
+    table = pa.Table.from_pandas(df, schema=silver_schema(df), preserve_index=False)
+
+    role_directory = os.path.join(dataset_directory, f"role={role}")
+    tmp_directory = f"{role_directory}.tmp"
+    old_directory = f"{role_directory}.old"
+    shutil.rmtree(tmp_directory, ignore_errors=True)
+    pq.write_to_dataset(table, tmp_directory, partition_cols=PARTITION_COLUMNS)
+
+    if os.path.exists(role_directory):
+        os.replace(role_directory, old_directory)
+    os.replace(tmp_directory, role_directory)
+    shutil.rmtree(old_directory, ignore_errors=True)
+    return role_directory
+
+
+def merge_role_partition(df, dataset_directory, role):
+    """Write df into the role=<role> partition of a dataset, keeping the rows
+    already there unless df has the same job (by job_id, or by description for
+    rows without one, like the converted notebook outputs)."""
+    role_directory = restore_role_partition(dataset_directory, role)
+    if os.path.exists(role_directory):
+        existing = pd.read_parquet(role_directory)
+        replaced = existing["job_description"].isin(df["job_description"])
+        if "job_id" in existing and "job_id" in df:
+            replaced |= existing["job_id"].isin(df["job_id"].dropna())
+        df = pd.concat([existing[~replaced], df], ignore_index=True)
+    return write_role_partition(df, dataset_directory, role)
+
+
+def write_atomic(path, write):
+    """Call write(tmp_path), then move the result into place in one step."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+class Manifest:
+    """Which bronze inputs (and their hashes) each silver partition was built from."""
+
+    def __init__(self, path):
+        self.path = path
+        self.inputs = {}
+        self.partitions = {}
+        if os.path.exists(path):
+            with open(path, "r") as file:
+                manifest = json.load(file)
+            self.inputs = manifest.get("inputs", {})
+            self.partitions = manifest.get("partitions", {})
+
+    def input_hash(self, path):
+        """Hash a bronze file, reusing the recorded hash if mtime and size match."""
+        stat = os.stat(path)
+        recorded = self.inputs.get(path)
+        if (
+            recorded
+            and recorded["mtime"] == stat.st_mtime
+            and recorded["size"] == stat.st_size
+        ):
+            return recorded["sha256"]
+        sha256 = file_sha256(path)
+        self.inputs[path] = {
+            "sha256": sha256,
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+        }
+        return sha256
+
+    def is_stale(self, partition, inputs):
+        built = self.partitions.get(partition)
+        return (
+            built is None
+            or built["inputs"] != inputs
+            or not os.path.exists(built["output"])
+        )
+
+    def record(self, partition, inputs, output, rows):
+        self.partitions[partition] = {
+            "inputs": inputs,
+            "output": output,
+            "rows": rows,
+            "built_at": datetime.now().isoformat(timespec="seconds"),
+        }
+
+    def save(self):
+        def write(tmp_path):
+            with open(tmp_path, "w") as file:
+                json.dump(
+                    {"inputs": self.inputs, "partitions": self.partitions},
+                    file,
+                    indent=2,
+                    sort_keys=True,
+                )
+
+        write_atomic(self.path, write)
+
+
+def build_jobs_partition(input_paths):
+    """Conform a partition's bronze files into one job table, one row per job_id."""
+    frames = []
+    for path in sorted(input_paths):
+        try:
+            _, adapter, df = load_bronze_file(path)
+        except ValueError as e:
+            logging.warning(f"Skipping {path}: {e}")
+            continue
+        frames.append(
+            df.assign(
+                source=adapter, scrape_date=scrape_date_of(path), source_file=path
+            )
+        )
+    if not frames:
+        return pd.DataFrame()
+    jobs = pd.concat(frames, ignore_index=True)
+    jobs = jobs.dropna(subset=["job_id"]).drop_duplicates("job_id", keep="last")
+    jobs["seniority"] = seniority_of(jobs["job_title"], jobs["experience_level"])
+    return jobs.join(parse_salaries(jobs["salary"]))
+
+
+def run_pipeline(
+    bronze_directory=BRONZE_DIRECTORY, silver_directory=SILVER_DIRECTORY, force=False
+):
+    manifest = Manifest(os.path.join(silver_directory, MANIFEST_FILE))
+    os.makedirs(silver_directory, exist_ok=True)
+    # Shared by all partitions, so cross-posted roles land in one cluster
+    neardups = NearDuplicateIndex(os.path.join(silver_directory, NEARDUPS_FILE))
+
+    partitions = {}
+    for path in find_bronze_files(bronze_directory):
+        partitions.setdefault(partition_of(path, bronze_directory), {})[
+            path
+        ] = manifest.input_hash(path)
+
+    rebuilt = []
+    for partition, inputs in sorted(partitions.items()):
+        if not force and not manifest.is_stale(partition, inputs):
+            logging.info(f"{partition}: up to date")
+            continue
+
+        jobs = build_jobs_partition(inputs)
+        if jobs.empty:
+            logging.warning(f"{partition}: no readable jobs, left as it was")
+            continue
+        jobs["cluster_id"] = neardups.assign(jobs)
+        output = write_role_partition(
+            jobs, os.path.join(silver_directory, JOBS_DATASET), partition
+        )
+        manifest.record(partition, inputs, output, len(jobs))
+        # Saved per partition, so an interrupted run does not redo finished work
+        manifest.save()
+        rebuilt.append(partition)
+        logging.info(f"{partition}: rebuilt {output} from {len(inputs)} files")
+
+    neardups.close()
+    manifest.save()
+    if rebuilt:
+        build_salary_percentiles(silver_directory)
+        update_salary_index(silver_directory, rebuilt)
+    return rebuilt
+
+
+def build_salary_percentiles(silver_directory=SILVER_DIRECTORY, by=("role", "geo")):
+    """Salary percentile table over all silver jobs, written next to the datasets."""
+    jobs = pd.read_parquet(
+        os.path.join(silver_directory, JOBS_DATASET),
+        columns=[
+            "role",
+            "location",
+            "salary_currency",
+            "salary_annual_min",
+            "salary_annual_max",
+        ],
+    )
+    jobs["geo"] = geo_of(jobs["location"])
+    table = salary_percentiles(jobs, by=list(by))
+    output = os.path.join(silver_directory, SALARY_PERCENTILES_FILE)
+    write_atomic(output, lambda tmp_path: table.to_parquet(tmp_path, index=False))
+    logging.info(f"Wrote {len(table)} salary groups from {len(jobs)} jobs to {output}")
+    return table
+
+
+def update_salary_index(silver_directory=SILVER_DIRECTORY, roles=None):
+    """Refresh the salary index for the given roles, reading only their silver
+    partitions. The whole index is rebuilt when roles is None or it does not exist."""
+    path = os.path.join(silver_directory, SALARY_INDEX_FILE)
+    if roles is None or not os.path.exists(path):
+        index, filters = SalaryIndex(), None
+    else:
+        index, filters = SalaryIndex.load(path), [("role", "in", list(roles))]
+    jobs = pd.read_parquet(
+        os.path.join(silver_directory, JOBS_DATASET),
+        columns=SALARY_INDEX_COLUMNS,
+        filters=filters,
+    )
+    index.update(jobs, jobs["role"].unique() if roles is None else roles)
+    index.save(path)
+    logging.info(f"Salary index: {len(index.keys)} groups, saved to {path}")
+    return index
+
+
+def convert_skills_file(path, role, silver_directory=SILVER_DIRECTORY, source="llm"):
+    """Move a hand-made skills JSON (the notebook output) into the skills dataset."""
+    with open(path, "r") as file:
+        text = file.read().strip().rstrip(",")
+    # v3 is written as comma separated objects rather than an array
+    records = json.loads(text if text.startswith("[") else f"[{text}]")
+    skills = pd.DataFrame(records).drop(columns=["index"], errors="ignore")
+    skills["source"] = source
+    skills["scrape_date"] = scrape_date_of(path)
+    return merge_role_partition(
+        skills, os.path.join(silver_directory, SKILLS_DATASET), slugify(role)
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(
+        description="Rebuild the silver partitions whose bronze inputs changed."
+    )
+    parser.add_argument("--bronze", default=BRONZE_DIRECTORY)
+    parser.add_argument("--silver", default=SILVER_DIRECTORY)
+    parser.add_argument("--force", action="store_true", help="rebuild everything")
+    parser.add_argument(
+        "--skills", metavar="JSON", help="convert a skills JSON file instead"
+    )
+    parser.add_argument("--role", help="role partition for --skills")
+    args = parser.parse_args()
+    if args.skills:
+        if not args.role:
+            parser.error("--skills needs --role")
+        convert_skills_file(args.skills, args.role, args.silver)
+    else:
+        run_pipeline(args.bronze, args.silver, force=args.force)
@@ -1,35 +1,259 @@
+import argparse
+import json
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List
+
 from langchain.llms import Ollama
-from langchain.callbacks.manager import CallbackManager
-from langchain.callbacks.streaming_stdout import StreamingStdOutCallbackHandler
 import pandas as pd
+from pydantic import BaseModel
+
+from descriptions import prepare_descriptions
+from jobsink import JsonLinesSink
+from llmcache import LLM_CACHE_FILE, LLMCache, cache_key
+from pipeline import SILVER_DIRECTORY, SKILLS_DATASET, merge_role_partition, scrape_date_of
+from skillgap import build_skill_matrix
+from skillmatcher import MIN_MATCHED_SKILLS, SkillMatcher
+from sources import load_bronze_file
+
+MODEL_NAME = "neural-chat:7b-v3.2-fp16"
+TEMPERATURE = 0.7
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+CONCURRENCY = 4
+MAX_RETRIES = 3
+BACKOFF = 2  # seconds, doubled after every failed attempt
+
 
-model = Ollama(
-    model="neural-chat:7b-v3.2-fp16",
-    temperature=0.7,
-    callback_manager=CallbackManager([StreamingStdOutCallbackHandler()]),
-    verbose=True,
-)
+class Skill(BaseModel):
+    name: str
+    reference_text: str
+
+
+class Job(BaseModel):
+    skills: List[Skill]
 
-job_postings = pd.read_csv(
-    "../data/jobs_Head_of_Product_-_European_Union_-_Remote_-_LinkedIn.csv"
-)
-descriptions = job_postings["job_description"].to_list()
-test_output = descriptions[0]
 
 desired_format = """
-[{ "skills": <keywords>, "reference": <sentence from description>}]
+{ "skills": [{ "name": <keywords>, "reference_text": <sentence from description>}] }
 """
 example = """
-[{ "skills": "python", "reference": "You will be able to write python code."},
-{ "skills": "java", "reference": "You will be able to write java code."}]
+{ "skills": [{ "name": "python", "reference_text": "You will be able to write python code."},
+{ "name": "java", "reference_text": "You will be able to write java code."}] }
 """
-prompt = f"""
+prompt_template = """
 You are a helpful assisant to extract job skills and references from job descriptions.
 Your responses should be in the following format:\n\n
 {desired_format}\n\n
 Here is an example output:\n\n
 {example}\n\n
-Extract the Job skills, with the reference text to that skill, from the following description: {test_output}
+Extract the Job skills, with the reference text to that skill, from the following description: {description}
 """
-print(prompt)
-print(model(prompt))
+
+
+def create_model(model=MODEL_NAME, temperature=TEMPERATURE, base_url=OLLAMA_BASE_URL):
+    return Ollama(model=model, temperature=temperature, base_url=base_url)
+
+
+def build_prompt(description):
+    return prompt_template.format(
+        desired_format=desired_format, example=example, description=description
+    )
+
+
+def parse_response(text):
+    """Parse the model's answer into a Job, tolerating prose around the JSON."""
+    match = re.search(r"[\[{].*[\]}]", text, re.DOTALL)
+    if not match:
+        raise ValueError("No JSON found in the model response")
+    data = json.loads(match.group())
+    if isinstance(data, list):
+        data = {"skills": data}
+    # The older prompt asked for {"skills": ..., "reference": ...} items
+    data["skills"] = [
+        {
+            "name": skill.get("name", skill.get("skills")),
+            "reference_text": skill.get("reference_text", skill.get("reference")),
+        }
+        for skill in data.get("skills", [])
+    ]
+    return Job.model_validate(data)
+
+
+def extract_skills(
+    model, description, cache=None, max_retries=MAX_RETRIES, backoff=BACKOFF
+):
+    """Prompt the model for one description, retrying with exponential backoff.
+
+    With a cache, a description already extracted with the same prompt, model and
+    temperature is answered from disk.
+    """
+    if cache is not None:
+        # The prompt without the description covers the format and example too
+        key = cache_key(description, build_prompt(""), model.model, model.temperature)
+        cached = cache.get(key)
+        if cached is not None:
+            return Job.model_validate(cached)
+
+    prompt = build_prompt(description)
+    for attempt in range(max_retries + 1):
+        try:
+            job = parse_response(model(prompt))
+            if cache is not None:
+                cache.put(key, job.model_dump())
+            return job
+        except Exception as e:
+            # Unparsable output (ValueError, ValidationError) or a connection error
+            error = e
+        if attempt < max_retries:
+            delay = backoff * 2**attempt
+            logging.warning(f"Extraction failed ({error}), retrying in {delay}s")
+            time.sleep(delay)
+    raise error
+
+
+def extract_batch(
+    model,
+    jobs,
+    sink,
+    concurrency=CONCURRENCY,
+    cache=None,
+    prompts=None,
+    **retry_kwargs,
+):
+    """Extract skills for every row of jobs on a thread pool, writing each result to
+    sink as soon as it is done. Returns the number of failed rows.
+
+    prompts, a Series aligned with jobs, is the text sent to the model in place of
+    job_description.
+    """
+    if prompts is None:
+        prompts = jobs["job_description"]
+    lock = threading.Lock()
+    failed = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {
+            executor.submit(extract_skills, model, prompt, cache, **retry_kwargs): job
+            for job, prompt in zip(jobs.to_dict(orient="records"), prompts)
+        }
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                skills = future.result()
+            except Exception as e:
+                failed += 1
+                logging.error(f"Giving up on job {job['job_id']}: {e}")
+                continue
+            with lock:
+                sink.write(
+                    {**job, "skills": skills.model_dump(), "extracted_by": "llm"}
+                )
+    return failed
+
+
+def write_matched_jobs(
+    jobs, sink, skills_directory, min_matched=MIN_MATCHED_SKILLS
+):
+    """Write the jobs the skill matcher covers well enough to sink; returns the
+    rest, which still need the model."""
+    matcher = SkillMatcher.from_silver(skills_directory)
+    matched = jobs["job_description"].map(matcher.match)
+    covered = matched.str.len() >= min_matched
+    for job, skills in zip(jobs[covered].to_dict(orient="records"), matched[covered]):
+        sink.write({**job, "skills": {"skills": skills}, "extracted_by": "matcher"})
+    logging.info(f"{int(covered.sum())} of {len(jobs)} jobs covered by the matcher")
+    return jobs[~covered]
+
+
+def extract_bronze_file(
+    path,
+    role,
+    silver_directory=SILVER_DIRECTORY,
+    model=None,
+    concurrency=CONCURRENCY,
+    cache_file=LLM_CACHE_FILE,
+    prepare=True,
+    min_matched=MIN_MATCHED_SKILLS,
+):
+    """Extract skills for a bronze file into the role's partition of the skills dataset.
+
+    Results are appended to a JSON Lines staging file per role, so an interrupted
+    run continues with the jobs that are not done yet. cache_file=None disables the
+    LLM cache; prepare=False prompts with the full descriptions.
+
+    Postings in which the dictionary matcher already finds min_matched skills are
+    taken from the matcher and never go to the model; min_matched=0 sends all.
+    """
+    model = model or create_model()
+    cache = LLMCache(cache_file) if cache_file else None
+    _, adapter, jobs = load_bronze_file(path)
+    jobs = jobs.dropna(subset=["job_id", "job_description"]).drop_duplicates("job_id")
+    jobs = jobs[["job_id", "job_title", "job_description"]].assign(
+        source=adapter, scrape_date=scrape_date_of(path)
+    )
+
+    dataset_directory = os.path.join(silver_directory, SKILLS_DATASET)
+    staging = os.path.join(dataset_directory, "_staging", f"{role}.jsonl")
+    try:
+        with JsonLinesSink(staging, append=True) as sink:
+            done = {record["job_id"] for record in sink.read_records()}
+            jobs = jobs[~jobs["job_id"].isin(done)]
+            if min_matched:
+                jobs = write_matched_jobs(jobs, sink, dataset_directory, min_matched)
+            logging.info(f"Extracting skills for {len(jobs)} jobs from {path}")
+            prompts = None
+            if prepare:
+                prompts, before, after = prepare_descriptions(jobs["job_description"])
+                logging.info(
+                    f"Prepared descriptions: {before} -> {after} tokens "
+                    f"({1 - after / before if before else 0:.0%} smaller)"
+                )
+            failed = extract_batch(
+                model, jobs, sink, concurrency=concurrency, cache=cache, prompts=prompts
+            )
+            records = list(sink.read_records())
+    finally:
+        if cache is not None:
+            cache.close()
+
+    merge_role_partition(pd.DataFrame(records), dataset_directory, role)
+    logging.info(f"{len(records)} jobs with skills for {role}, {failed} failed")
+    build_skill_matrix(silver_directory)
+    return failed
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(
+        description="Extract skills from a bronze file with the local LLM."
+    )
+    parser.add_argument("path", help="bronze CSV or JSON file")
+    parser.add_argument("--role", required=True, help="role partition to write")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--silver", default=SILVER_DIRECTORY)
+    parser.add_argument("--cache", default=LLM_CACHE_FILE, help="LLM cache file")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument(
+        "--full-descriptions",
+        action="store_true",
+        help="prompt with the descriptions as scraped",
+    )
+    parser.add_argument(
+        "--min-matched",
+        type=int,
+        default=MIN_MATCHED_SKILLS,
+        help="skip the model for postings with this many dictionary matches (0: never)",
+    )
+    args = parser.parse_args()
+    extract_bronze_file(
+        args.path,
+        args.role,
+        silver_directory=args.silver,
+        concurrency=args.concurrency,
+        cache_file=None if args.no_cache else args.cache,
+        prepare=not args.full_descriptions,
+        min_matched=args.min_matched,
+    )
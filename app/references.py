@@ -0,0 +1,168 @@
+import argparse
+import collections
+import logging
+import os
+import re
+import unicodedata
+from difflib import SequenceMatcher
+
+import pandas as pd
+
+from pipeline import SILVER_DIRECTORY, SKILLS_DATASET
+
+WORD_RE = re.compile(r"\w+")
+MIN_SCORE = 0.8  # fuzzy matches below this count as not found in the description
+
+
+def normalize_token(token):
+    return unicodedata.normalize("NFKC", token).casefold()
+
+
+def nfc_spans(text):
+    """NFC-normalize text, with the span in text of every normalized character,
+    or None for the spans when text is already NFC."""
+    if unicodedata.is_normalized("NFC", text):
+        return text, None
+    # A character composes only with the combining marks (and Hangul vowels and
+    # final consonants) following it, so each such run is normalized on its own
+    starts = [
+        position
+        for position, char in enumerate(text)
+        if position == 0
+        or not (unicodedata.combining(char) or "\u1161" <= char <= "\u11c2")
+    ]
+    pieces, spans = [], []
+    for start, end in zip(starts, starts[1:] + [len(text)]):
+        piece = unicodedata.normalize("NFC", text[start:end])
+        pieces.append(piece)
+        spans.extend([(start, end)] * len(piece))
+    return "".join(pieces), spans
+
+
+class DescriptionIndex:
+    """The words of a description with their character offsets, and the positions
+    of every distinct word, so a reference text is located without scanning.
+
+    Words are matched in the NFC form of the description (so a decomposed "é"
+    stays one word), but the offsets are into the description as given.
+    """
+
+    def __init__(self, text):
+        normalized, spans = nfc_spans(text or "")
+        matches = list(WORD_RE.finditer(normalized))
+        self.tokens = [normalize_token(match.group()) for match in matches]
+        if spans is None:
+            self.starts = [match.start() for match in matches]
+            self.ends = [match.end() for match in matches]
+        else:
+            self.starts = [spans[match.start()][0] for match in matches]
+            self.ends = [spans[match.end() - 1][1] for match in matches]
+        self.positions = collections.defaultdict(list)
+        for position, token in enumerate(self.tokens):
+            self.positions[token].append(position)
+
+    def locate(self, reference_text):
+        """Find reference_text, ignoring case, punctuation and whitespace.
+
+        Returns (start, end, score): the character span in the description of the
+        best aligned window and how similar its words are (1.0 for an exact match).
+        start and end are None when no word of the reference occurs at all.
+        """
+        reference = [
+            normalize_token(token) for token in WORD_RE.findall(reference_text or "")
+        ]
+        if not reference:
+            return None, None, 0.0
+
+        # Every occurrence of a reference word votes for where the reference
+        # would begin; the window with the most votes is the candidate alignment
+        votes = collections.Counter()
+        for offset, token in enumerate(reference):
+            for position in self.positions.get(token, ()):
+                votes[position - offset] += 1
+        if not votes:
+            return None, None, 0.0
+
+        best = None
+        for begin, _ in votes.most_common(3):
+            begin = max(begin, 0)
+            window = self.tokens[begin : begin + len(reference)]
+            score = SequenceMatcher(None, reference, window, autojunk=False).ratio()
+            if best is None or score > best[1]:
+                best = (begin, score)
+            if score == 1.0:
+                break
+
+        begin, score = best
+        end = min(begin + len(reference), len(self.tokens)) - 1
+        return self.starts[begin], self.ends[end], score
+
+
+def verify_references(skills):
+    """One row per extracted skill of a silver skills frame, with the span of its
+    reference_text in the job description and a match score."""
+    rows = []
+    for job in skills.itertuples(index=False):
+        index = DescriptionIndex(job.job_description)
+        for skill in job.skills:
+            start, end, score = index.locate(skill["reference_text"])
+            rows.append(
+                {
+                    "job_id": getattr(job, "job_id", None),
+                    "role": getattr(job, "role", None),
+                    "name": skill["name"],
+                    "reference_text": skill["reference_text"],
+                    "start": start,
+                    "end": end,
+                    "score": score,
+                }
+            )
+    spans = pd.DataFrame(
+        rows,
+        columns=["job_id", "role", "name", "reference_text", "start", "end", "score"],
+    )
+    spans["start"] = spans["start"].astype("Int64")
+    spans["end"] = spans["end"].astype("Int64")
+    return spans
+
+
+def verified_skills(skills, min_score=MIN_SCORE):
+    """The skills frame with only the skills whose reference_text was found."""
+    kept = []
+    for job in skills.itertuples(index=False):
+        index = DescriptionIndex(job.job_description)
+        kept.append(
+            [
+                skill
+                for skill in job.skills
+                if index.locate(skill["reference_text"])[2] >= min_score
+            ]
+        )
+    return skills.assign(skills=kept)
+
+
+def summarize(spans, min_score=MIN_SCORE):
+    found = spans.assign(
+        exact=spans["score"] == 1.0, found=spans["score"] >= min_score
+    )
+    return found.groupby("role", dropna=False).agg(
+        skills=("name", "size"), exact=("exact", "mean"), found=("found", "mean")
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(
+        description="Check extracted skills' reference texts against the descriptions."
+    )
+    parser.add_argument("--silver", default=SILVER_DIRECTORY)
+    parser.add_argument("--min-score", type=float, default=MIN_SCORE)
+    parser.add_argument("--output", help="CSV for every skill's span and score")
+    args = parser.parse_args()
+
+    skills = pd.read_parquet(os.path.join(args.silver, SKILLS_DATASET))
+    spans = verify_references(skills)
+    print(summarize(spans, args.min_score).to_string())
+    if args.output:
+        spans.to_csv(args.output, index=False)
+        logging.info(f"Wrote {len(spans)} spans to {args.output}")
@@ -0,0 +1,133 @@
+import pandas as pd
+
+PERCENTILES = [0.1, 0.25, 0.5, 0.75, 0.9]
+
+# "$65 - $70 an hour", "Up to $85,000 a year", "$139,500.00-$198,000.00",
+# "$120K/yr - $150K/yr" or "zł20,000 - zł25,000 / month", matched lowercased
+AMOUNT = r"(\d[\d,]*(?:\.\d+)?)\s*(k)?"
+AMOUNT_PERIOD = r"(?:\s*(?:/|an?\b|per\b)\s*(?:hour|hr|day|week|month|year|yr)\b)?"
+RANGE_RE = rf"{AMOUNT}{AMOUNT_PERIOD}(?:\s*(?:-|–|to)\s*\D{{0,3}}?\s*{AMOUNT})?"
+BOUND_RE = r"^\s*(up to|from|starting at)\b"
+CURRENCY_RE = r"(\$|€|£|zł|usd|eur|gbp|pln|cad|chf)"
+PERIOD_RE = r"\b(hour|hr|day|week|month|year|yr|annum|annual(?:ly)?)\b"
+
+CURRENCIES = {"$": "USD", "€": "EUR", "£": "GBP", "zł": "PLN"}
+PERIODS = {
+    "hr": "hour",
+    "yr": "year",
+    "annum": "year",
+    "annual": "year",
+    "annually": "year",
+}
+ANNUAL_FACTOR = {"hour": 2080, "day": 260, "week": 52, "month": 12, "year": 1}
+# LinkedIn exports have no period ("$120.00-$140.00"); below this it is hourly
+HOURLY_BELOW = 1000
+
+STATE_RE = r",\s*([A-Z]{2})\b"
+
+# Title keywords per seniority, most senior first; titles matching none fall back
+# on the LinkedIn experience level, then "mid"
+SENIORITY_TITLES = [
+    ("executive", r"\b(?:chief|cto|cdo|vp|vice president|head of|director)\b"),
+    ("lead", r"\b(?:lead|principal|staff)\b"),
+    ("senior", r"\b(?:senior|sr\.?|iii|iv)\b"),
+    ("junior", r"\b(?:junior|jr\.?|entry|graduate|intern|trainee)\b"),
+]
+SENIORITY_LEVELS = {
+    "entry level": "junior",
+    "internship": "junior",
+    "associate": "junior",
+    "director": "executive",
+    "executive": "executive",
+}
+
+
+def parse_amount(numbers, thousands):
+    amount = pd.to_numeric(numbers.str.replace(",", "", regex=False), errors="coerce")
+    return amount.where(thousands.isna(), amount * 1000)
+
+
+def parse_salaries(salaries):
+    """Parse free-text salaries into currency, period, and the range both as
+    written and annualized. Rows that cannot be parsed are all NA."""
+    # Salary texts repeat a lot across postings, so each distinct one is parsed once
+    codes, uniques = pd.factorize(salaries.astype("string"))
+    parsed = parse_distinct_salaries(pd.Series(uniques, dtype="string"))
+    # Code -1 (missing salary) picks the all-NA row appended at the end
+    parsed = pd.concat([parsed, parsed.iloc[:0].reindex([len(parsed)])])
+    return parsed.iloc[codes].set_axis(salaries.index)
+
+
+def parse_distinct_salaries(salaries):
+    lower = salaries.str.lower()
+
+    amounts = lower.str.extract(RANGE_RE)
+    low = parse_amount(amounts[0], amounts[1])
+    high = parse_amount(amounts[2], amounts[3])
+
+    # "Up to X" is only a maximum, "From X" only a minimum
+    bound = lower.str.extract(BOUND_RE, expand=False)
+    single = high.isna()
+    # bound is NA without a bound word, and where() would treat NA as False
+    only_max = single & bound.eq("up to").fillna(False)
+    only_min = single & bound.isin(["from", "starting at"]).fillna(False)
+    minimum = low.where(~only_max)
+    maximum = high.fillna(low).where(~only_min)
+
+    currency = lower.str.extract(CURRENCY_RE, expand=False)
+    currency = currency.str.upper().replace(
+        {symbol.upper(): code for symbol, code in CURRENCIES.items()}
+    )
+    period = lower.str.extract(PERIOD_RE, expand=False).replace(PERIODS)
+    typical = pd.concat([minimum, maximum], axis=1).max(axis=1)
+    guessed = typical.lt(HOURLY_BELOW).map({True: "hour", False: "year"})
+    period = period.fillna(guessed.where(typical.notna()))
+
+    factor = period.map(ANNUAL_FACTOR).astype("float")
+    return pd.DataFrame(
+        {
+            "salary_currency": currency.astype("string"),
+            "salary_period": period.astype("string"),
+            "salary_min": minimum,
+            "salary_max": maximum,
+            "salary_annual_min": minimum * factor,
+            "salary_annual_max": maximum * factor,
+        },
+        index=salaries.index,
+    )
+
+
+def geo_of(locations):
+    """A coarse location to group salaries by: "Remote", a US state code, or the
+    last part of the location (usually the country)."""
+    locations = locations.astype("string").str.strip()
+    state = locations.str.extract(STATE_RE, expand=False)
+    last_part = locations.str.split(",").str[-1].str.strip()
+    geo = state.fillna(last_part)
+    return geo.mask(locations.str.contains("remote", case=False, na=False), "Remote")
+
+
+def seniority_of(titles, experience_levels=None):
+    """junior, mid, senior, lead or executive from the job title, else from the
+    LinkedIn experience level."""
+    titles = titles.astype("string").str.lower()
+    seniority = pd.Series(pd.NA, index=titles.index, dtype="string")
+    for level, pattern in reversed(SENIORITY_TITLES):
+        seniority = seniority.mask(titles.str.contains(pattern, na=False), level)
+    if experience_levels is not None:
+        levels = experience_levels.astype("string").str.lower().map(SENIORITY_LEVELS)
+        seniority = seniority.fillna(levels.astype("string"))
+    return seniority.fillna("mid")
+
+
+def salary_percentiles(jobs, by=("role", "geo"), percentiles=PERCENTILES):
+    """Percentiles of the annual salary midpoint per group and currency."""
+    midpoint = jobs[["salary_annual_min", "salary_annual_max"]].mean(axis=1)
+    salaries = jobs.assign(salary_annual=midpoint).dropna(subset=["salary_annual"])
+    groups = salaries.groupby(
+        [*by, "salary_currency"], dropna=False, observed=True
+    )["salary_annual"]
+    table = groups.quantile(percentiles).unstack()
+    table.columns = [f"p{round(p * 100)}" for p in table.columns]
+    table.insert(0, "postings", groups.size())
+    return table.reset_index()
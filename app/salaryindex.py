@@ -0,0 +1,199 @@
+import argparse
+import collections
+import itertools
+import logging
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from salaries import geo_of
+
+SALARY_INDEX_FILE = "salary_index.npz"
+# Columns of the silver jobs dataset the index is built from
+SALARY_INDEX_COLUMNS = [
+    "role",
+    "location",
+    "seniority",
+    "salary_currency",
+    "salary_annual_min",
+    "salary_annual_max",
+]
+PERCENTILES = np.array([10, 25, 50, 75, 90])
+MIN_POSTINGS = 3  # fewer postings than this and lookup tries a broader group
+ANY = "*"
+SEPARATOR = "\x1f"
+
+SalaryEstimate = collections.namedtuple(
+    "SalaryEstimate",
+    [
+        "role",
+        "geo",
+        "seniority",
+        "currency",
+        "postings",
+        "p10",
+        "p25",
+        "p50",
+        "p75",
+        "p90",
+    ],
+)
+
+
+def fallbacks(role, geo, seniority):
+    """The groups to try for a lookup, most specific first."""
+    return [
+        (role, geo, seniority),
+        (role, geo, ANY),
+        (role, ANY, seniority),
+        (role, ANY, ANY),
+        (ANY, geo, seniority),
+        (ANY, ANY, seniority),
+        (ANY, ANY, ANY),
+    ]
+
+
+class SalaryIndex:
+    """Annual salary percentiles per (role, geo, seniority, currency), including
+    every rollup where a dimension is "*", precomputed for constant-time lookups.
+
+    The sorted salaries of each base group are kept as well, so the roles that
+    changed can be replaced without re-reading the others.
+    """
+
+    def __init__(self, groups=None):
+        # (role, geo, seniority, currency) -> sorted annual salary midpoints
+        self.groups = groups or {}
+        self._precompute()
+
+    def _precompute(self):
+        rollups = collections.defaultdict(list)
+        for (role, geo, seniority, currency), values in self.groups.items():
+            for key in itertools.product((role, ANY), (geo, ANY), (seniority, ANY)):
+                rollups[(*key, currency)].append(values)
+        self.keys = list(rollups)
+        self.rows = {key: row for row, key in enumerate(self.keys)}
+        self.counts = np.array(
+            [sum(map(len, rollups[key])) for key in self.keys], dtype=np.int64
+        )
+        self.quantiles = np.array(
+            [
+                np.percentile(np.concatenate(rollups[key]), PERCENTILES)
+                for key in self.keys
+            ]
+        ).reshape(len(self.keys), len(PERCENTILES))
+
+    @staticmethod
+    def group_salaries(jobs):
+        """Base groups of a jobs frame with role, location, seniority and the
+        annual salary columns."""
+        midpoint = jobs[["salary_annual_min", "salary_annual_max"]].mean(axis=1)
+        salaries = pd.DataFrame(
+            {
+                "role": jobs["role"].astype("string"),
+                "geo": geo_of(jobs["location"]).fillna("unknown"),
+                "seniority": jobs["seniority"].astype("string").fillna("mid"),
+                "currency": jobs["salary_currency"].astype("string"),
+                "salary": midpoint,
+            }
+        ).dropna(subset=["salary", "currency"])
+        return {
+            key: np.sort(group["salary"].to_numpy(dtype=np.float64))
+            for key, group in salaries.groupby(["role", "geo", "seniority", "currency"])
+        }
+
+    @classmethod
+    def from_jobs(cls, jobs):
+        return cls(cls.group_salaries(jobs))
+
+    def update(self, jobs, roles):
+        """Replace the groups of roles with those computed from jobs."""
+        roles = set(roles)
+        groups = {
+            key: values for key, values in self.groups.items() if key[0] not in roles
+        }
+        groups.update(self.group_salaries(jobs))
+        self.groups = groups
+        self._precompute()
+        return self
+
+    def lookup(
+        self, role, geo=ANY, seniority=ANY, currency="USD", min_postings=MIN_POSTINGS
+    ):
+        """Percentiles for the most specific group with at least min_postings
+        postings, or None when nothing matches."""
+        best = None
+        for key in fallbacks(role, geo, seniority):
+            row = self.rows.get((*key, currency))
+            if row is None:
+                continue
+            if best is None:
+                best = row
+            if self.counts[row] >= min_postings:
+                best = row
+                break
+        if best is None:
+            return None
+        return SalaryEstimate(
+            *self.keys[best], self.counts[best], *self.quantiles[best]
+        )
+
+    def save(self, path):
+        keys = [SEPARATOR.join(key) for key in self.groups]
+        values = list(self.groups.values())
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            group_keys=np.array(keys, dtype=str),
+            group_offsets=np.cumsum([0] + [len(v) for v in values]),
+            group_values=np.concatenate(values) if values else np.empty(0),
+            keys=np.array([SEPARATOR.join(key) for key in self.keys], dtype=str),
+            counts=self.counts,
+            quantiles=self.quantiles,
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Load a saved index; the rollups are stored, so nothing is recomputed."""
+        index = cls.__new__(cls)
+        with np.load(path) as data:
+            offsets = data["group_offsets"]
+            values = data["group_values"]
+            index.groups = {
+                tuple(key.split(SEPARATOR)): values[start:end]
+                for key, start, end in zip(
+                    data["group_keys"].tolist(), offsets[:-1], offsets[1:]
+                )
+            }
+            index.keys = [tuple(key.split(SEPARATOR)) for key in data["keys"].tolist()]
+            index.counts = data["counts"]
+            index.quantiles = data["quantiles"]
+        index.rows = {key: row for row, key in enumerate(index.keys)}
+        return index
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Look up expected salary percentiles.")
+    parser.add_argument("role")
+    parser.add_argument("--geo", default=ANY, help='e.g. "Remote", "CA" or a country')
+    parser.add_argument(
+        "--seniority", default=ANY, help="junior, mid, senior, lead or executive"
+    )
+    parser.add_argument("--currency", default="USD")
+    parser.add_argument("--silver", default="./data/silver")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = SalaryIndex.load(os.path.join(args.silver, SALARY_INDEX_FILE))
+    loaded = time.perf_counter()
+    estimate = index.lookup(args.role, args.geo, args.seniority, args.currency)
+    looked_up = time.perf_counter()
+    print(estimate)
+    logging.info(
+        f"Loaded in {(loaded - start) * 1000:.1f} ms, "
+        f"looked up in {(looked_up - loaded) * 1e6:.0f} µs"
+    )
@@ -40,20 +40,49 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import (
     TimeoutException,
     NoSuchElementException,
+    StaleElementReferenceException,
     WebDriverException,
 )
 import os
 from dotenv import load_dotenv
 from urllib.parse import urlparse, parse_qs, urlencode
 from urllib.error import URLError
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 import re
 from pydantic import BaseModel
+import queue
+import threading
 import time
 from tqdm import tqdm
+from jobsink import FSYNC_EVERY, open_sink, staging_filename
+from checkpoints import CHECKPOINT_FILE, CheckpointStore
+from seenjobs import SEEN_JOBS_FILE, SeenJobs
+from jobindex import JOB_INDEX_FILE, JobIndex
+from httpfetch import DescriptionFetcher
+from waits import (
+    CLICK_PACING,
+    PAGE_PACING,
+    RETRY_PACING,
+    WAIT_TIMEOUT,
+    any_of,
+    card_count_at_least,
+    card_count_grew,
+    description_changed,
+    description_text,
+    end_of_results_present,
+    sweep_list,
+    wait_for,
+)
 
 load_dotenv()
 
+try:
+    import lxml  # noqa: F401
+
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
 CHROME_BINARY_LOCATION = "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"
 
 LOGIN_URL_LINKEDIN = "https://www.linkedin.com/login"
@@ -66,6 +95,8 @@ SEARCH_RESULTS_LIST_CLASS_LINKEDIN = "jobs-search-results-list"
 JOB_LIST_ITEM_CLASS_LINKEDIN = "jobs-search-results__list-item"
 LINK_CLASS_LINKEDIN = "job-card-container__link"
 DESCRIPTION_CLASS_LINKEDIN = "jobs-description-content__text"
+DESCRIPTION_MARKUP_CLASS_LINKEDIN = "show-more-less-html__markup"
+JOB_VIEW_URL_LINKEDIN = "https://www.linkedin.com/jobs/view/{job_id}/"
 TITLE_CLASS_LINKEDIN = "job-card-list__title"
 LOCATION_CLASS_LINKEDIN = "job-card-container__metadata-item"
 COMPANY_NAME_CLASS_LINKEDIN = "job-card-container__primary-description"
@@ -77,15 +108,22 @@ PROFILE_PIC_CLASS_LINKEDIN = "global-nav__me-photo"
 TOTAL_SEARCH_RESULTS_STRING_LINKEDIN = "jobs-search-results-list__subtitle"
 
 
-def set_up_selenium():
+def set_up_selenium(headless=False):
     options = webdriver.ChromeOptions()
     options.binary_location = CHROME_BINARY_LOCATION
     # options.add_argument("--start-maximized")
-    options.add_experimental_option("detach", True)
+    if headless:
+        options.add_argument("--headless=new")
+        options.add_argument("--window-size=1920,1080")
+    else:
+        options.add_experimental_option("detach", True)
 
     driver = webdriver.Chrome(options=options)
     logging.info("Webdriver initialized")
-    driver.implicitly_wait(10)
+    # All waiting is explicit (see waits.py); an implicit wait would stall every
+    # find_element that is expected to miss, e.g. on half-rendered job cards
+    driver.implicitly_wait(0)
+    driver.set_script_timeout(WAIT_TIMEOUT)
 
     return driver
 
@@ -101,6 +139,10 @@ class LinkedIn:
     job_list_item_class = JOB_LIST_ITEM_CLASS_LINKEDIN
     link_class = LINK_CLASS_LINKEDIN
     description_class = DESCRIPTION_CLASS_LINKEDIN
+    # Logged-in job pages use the first, the public job page the second
+    description_classes = (DESCRIPTION_CLASS_LINKEDIN, DESCRIPTION_MARKUP_CLASS_LINKEDIN)
+    job_view_url = JOB_VIEW_URL_LINKEDIN
+    html_parser = HTML_PARSER
     title_class = TITLE_CLASS_LINKEDIN
     location_class = LOCATION_CLASS_LINKEDIN
     company_name_class = COMPANY_NAME_CLASS_LINKEDIN
@@ -208,11 +250,7 @@ def prepare_search_results_page(driver, site, current_page):
         )
         driver.get(site.compose_url(current_page - 1))
         # Wait for the pagination element to be present
-        WebDriverWait(driver, 30).until(
-            EC.presence_of_element_located(
-                (By.CLASS_NAME, site.end_of_results_list_class)
-            )
-        )
+        WebDriverWait(driver, 30).until(end_of_results_present(site))
         total_results = driver.find_element(
             By.CLASS_NAME, site.total_search_results_string
         ).text
@@ -247,21 +285,27 @@ def load_search_results(driver, site, total_results, current_page):
             driver_job_list = driver.find_elements(
                 By.CLASS_NAME, site.job_list_item_class
             )
-            page_source = BeautifulSoup(driver.page_source, "html.parser")
-            job_list = page_source.find_all("li", class_=site.job_list_item_class)
 
-            if (
-                len(driver_job_list) >= expected_results
-                and len(job_list) >= expected_results
+            if len(driver_job_list) >= expected_results and is_selenium_element_loaded(
+                driver_job_list[-1], site
             ):
-                if is_selenium_element_loaded(
-                    driver_job_list[-1]
-                ) and is_bs_element_loaded(job_list[-1], site):
+                # Only snapshot and parse the page once the cards look complete
+                job_cards = parse_job_cards(driver.page_source, site)
+                if len(job_cards) >= expected_results:
                     logging.info("Found all job results")
-                    return driver_job_list, job_list
+                    return driver_job_list, job_cards
 
+            # Sweep the list so the remaining cards render, then wait for more
+            # cards or for the last one to fill in, whichever comes first
             scroll_list(driver, site)
-            time.sleep(1.5)
+            wait_for(
+                driver,
+                any_of(
+                    card_count_grew(site, len(driver_job_list)),
+                    last_card_loaded(site),
+                ),
+                timeout=2,
+            )
 
         except WebDriverException as e:
             retry_count += 1
@@ -282,6 +326,32 @@ def load_search_results(driver, site, total_results, current_page):
     logging.info("Process interrupted by the user.")
 
 
+def parse_job_cards(page_source, site):
+    """Parse a search results snapshot once into card metadata keyed by job id."""
+    # Only the job cards are built into a tree; the rest of the page is skipped
+    only_cards = SoupStrainer("li", class_=site.job_list_item_class)
+    page = BeautifulSoup(page_source, site.html_parser, parse_only=only_cards)
+
+    job_cards = {}
+    for card in page.find_all("li", class_=site.job_list_item_class):
+        job_id = card.get("data-occludable-job-id")
+        if not job_id or not is_bs_element_loaded(card, site):
+            continue
+        link_element = card.find("a", class_=site.link_class)
+        job_cards[job_id] = {
+            "title": link_element.get_text(strip=True),
+            "company_name": card.find(
+                "span", class_=site.company_name_class
+            ).get_text(strip=True),
+            "location": card.find("li", class_=site.location_class).get_text(
+                strip=True
+            ),
+            "link": link_element["href"],
+            "id": job_id,
+        }
+    return job_cards
+
+
 def load_search_results_old(driver, site, total_results, current_page):
     expected_results = calculate_expected_results(
         total_results=total_results,
@@ -299,7 +369,7 @@ def load_search_results_old(driver, site, total_results, current_page):
             jl = len(job_list)
             if djl >= expected_results and jl >= expected_results:
                 if is_selenium_element_loaded(
-                    driver_job_list[-1]
+                    driver_job_list[-1], site
                 ) and is_bs_element_loaded(job_list[-1], site):
                     logging.info("found all job results")
                     break
@@ -311,7 +381,7 @@ def load_search_results_old(driver, site, total_results, current_page):
         exit(1)
 
 
-def is_selenium_element_loaded(driver_element):
+def is_selenium_element_loaded(driver_element, site):
     try:
         # Check if the necessary elements are present and not empty
         if not driver_element.find_element(By.CLASS_NAME, site.link_class).text.strip():
@@ -360,12 +430,20 @@ def is_bs_element_loaded(bs_element, site):
 
 
 def scroll_list(driver, site):
-    for i in range(300, 6000, 100):
-        driver.execute_script(
-            "arguments[0].scrollTo(0, {})".format(i),
-            driver.find_element(By.CLASS_NAME, site.search_results_list_class),
+    sweep_list(
+        driver, driver.find_element(By.CLASS_NAME, site.search_results_list_class)
+    )
+
+
+def last_card_loaded(site):
+    def _predicate(driver):
+        driver_job_list = driver.find_elements(By.CLASS_NAME, site.job_list_item_class)
+        return bool(driver_job_list) and is_selenium_element_loaded(
+            driver_job_list[-1], site
         )
 
+    return _predicate
+
 
 def calculate_expected_results(total_results, current_page, search_results_per_page):
     if is_last_page(current_page, search_results_per_page, total_results):
@@ -381,21 +459,80 @@ def is_last_page(current_page, search_results_per_page, total_results):
         return False
 
 
-def extract_jobs_from_joblist(driver, driver_job_list, job_list, site):
+def fetch_jobs_from_cards(fetcher, job_cards, known_job_ids=None, seen_jobs=None):
+    if known_job_ids is None:
+        known_job_ids = set()
+
+    job_ids = []
+    for job_id in job_cards:
+        if job_id in known_job_ids:
+            continue
+        if seen_jobs is not None and job_id in seen_jobs:
+            seen_jobs.touch(job_id)
+            continue
+        job_ids.append(job_id)
+
+    missing = []
+    for job_id, description in fetcher.fetch_descriptions(job_ids):
+        if not description:
+            logging.warning(f"No description found for job {job_id}")
+            missing.append(job_id)
+            continue
+        yield {**job_cards[job_id], "description": description}
+    # The jobs fetched are kept; raising leaves the page unfinished in the
+    # checkpoint, so a later run fetches the missing ones
+    if missing:
+        raise RuntimeError(
+            f"No description for {len(missing)} of {len(job_ids)} jobs: "
+            f"{', '.join(missing)}"
+        )
+
+
+def selected_job_id(driver):
+    """The job shown in the detail pane, as LinkedIn records it in the URL."""
+    query_params = parse_qs(urlparse(driver.current_url).query)
+    return query_params.get("currentJobId", [None])[0]
+
+
+def extract_jobs_from_joblist(
+    driver, driver_job_list, job_cards, site, known_job_ids=None, seen_jobs=None
+):
+    if known_job_ids is None:
+        known_job_ids = set()
     retry_count = 0
     max_retries = 5  # Set a limit for retries before asking for user input
     try:
-        for index, job in enumerate(job_list):
+        for index in range(len(driver_job_list)):
             while True:
                 try:
                     # Get a fresh reference to the link element on each attempt
                     link = driver_job_list[index].find_element(
                         By.CLASS_NAME, site.link_class
                     )
-                    if is_selenium_element_loaded(driver_job_list[index]):
+                    if is_selenium_element_loaded(driver_job_list[index], site):
+                        job_id = driver_job_list[index].get_attribute(
+                            "data-occludable-job-id"
+                        )
+                        # A card without an id can never be matched to its
+                        # metadata, so it is not clicked either
+                        skip = (
+                            job_id is None
+                            or job_id in known_job_ids
+                            or (seen_jobs is not None and job_id in seen_jobs)
+                        )
+                        if skip:
+                            break  # Captured before, no need to click it
+                        # The pane may already show another card, e.g. the one
+                        # LinkedIn selects on load, so wait for it to change,
+                        # unless this card is the one selected
+                        previous_description = (
+                            None
+                            if selected_job_id(driver) == job_id
+                            else description_text(driver, site)
+                        )
                         link.click()  # Click the link to load the job description
                         break  # Successful click, break out of the loop
-                except NoSuchElementException as e:
+                except (NoSuchElementException, StaleElementReferenceException) as e:
                     # Element not found, will try again after scrolling
                     # Check if the retry limit is reached
                     if retry_count >= max_retries:
@@ -408,28 +545,39 @@ def extract_jobs_from_joblist(driver, driver_job_list, job_list, site):
                             f"Retrying to scrape job description: {e}... Attempt {retry_count + 1}/{max_retries}"
                         )
 
-                # Scroll and wait for a brief period to allow content to load
+                # Scroll and wait until the card is back in the list
                 scroll_list(driver, site)
                 retry_count += 1
-                time.sleep(1.5)
-                driver_job_list = driver.find_elements(
-                    By.CLASS_NAME, site.job_list_item_class
-                )
+                RETRY_PACING.pause()
+                driver_job_list = wait_for(
+                    driver, card_count_at_least(site, index + 1)
+                ) or driver.find_elements(By.CLASS_NAME, site.job_list_item_class)
+
+            if skip:
+                if job_id is None:
+                    logging.warning(f"Job card {index} has no job id, skipping it")
+                    continue
+                if seen_jobs is not None:
+                    seen_jobs.touch(job_id)
+                logging.debug(f"Skipping already captured job {job_id}")
+                continue
 
             description_extraction_successful = False
             while not description_extraction_successful:
-                try:
-                    description_element = WebDriverWait(driver, 10).until(
-                        EC.presence_of_element_located(
-                            (By.CLASS_NAME, site.description_class)
-                        )
-                    )
-                    description = description_element.text
+                # The detail pane is reused between jobs, so wait for its text to
+                # change rather than for it to be present
+                new_description = wait_for(
+                    driver, description_changed(site, previous_description)
+                )
+                if new_description:
+                    description = new_description
                     description_extraction_successful = True
-                except TimeoutException as e:
-                    retry += 1
-                    logging.error(f"Error loading description for job {index}: {e}")
-                    if retry_count:
+                else:
+                    retry_count += 1
+                    # Two postings can share a description; settle for any text
+                    previous_description = None
+                    logging.error(f"Error loading description for job {index}")
+                    if retry_count >= max_retries:
                         input(
                             f"Failed to load description. Press Return to retry or Ctrl+C to stop."
                         )
@@ -439,75 +587,31 @@ def extract_jobs_from_joblist(driver, driver_job_list, job_list, site):
                             f"Retrying... Attempt {retry_count + 1}/{max_retries}"
                         )
 
-            while True:
-                try:
-                    # Re-fetch the page source for the specific job posting
-                    page_source = BeautifulSoup(driver.page_source, "html.parser")
-                    updated_job = page_source.find_all(
-                        "li", class_=site.job_list_item_class
-                    )[index]
-
-                    # Attempt to find the required BeautifulSoup elements in the updated job
-                    title_element = updated_job.find("a", class_=site.link_class)
-                    company_name_element = updated_job.find(
-                        "span", class_=site.company_name_class
-                    )
-                    location_element = updated_job.find(
-                        "li", class_=site.location_class
+            # The card metadata comes from the page snapshot; only re-parse when
+            # this card was not rendered yet when the snapshot was taken
+            while job_id not in job_cards:
+                retry_count += 1
+                logging.warning(f"Job {job_id} missing from the page snapshot")
+                if retry_count >= max_retries:
+                    input(
+                        f"Failed to extract job details. Press Return to retry or Ctrl+C to stop."
                     )
-                    link_element = updated_job.find("a", class_=site.link_class)
-
-                    # If all elements are found, proceed to extract data
-                    if all(
-                        [
-                            title_element,
-                            company_name_element,
-                            location_element,
-                            link_element,
-                        ]
-                    ):
-                        # Extract job details
-                        title = title_element.get_text(strip=True)
-                        company_name = company_name_element.get_text(strip=True)
-                        location = location_element.get_text(strip=True)
-                        link = link_element["href"]
-                        job_id = updated_job["data-occludable-job-id"]
-
-                        yield {
-                            "title": title,
-                            "company_name": company_name,
-                            "location": location,
-                            "link": link,
-                            "id": job_id,
-                            "description": description,
-                        }
-                        break  # Successfully extracted, break out of the loop
-                except Exception as e:
-                    retry_count += 1
-                    # Log the exception for debugging
-                    logging.warning(f"Encountered an issue: {e}")
-                    if retry_count >= max_retries:
-                        input(
-                            f"Failed to extract job details. Press Return to retry or Ctrl+C to stop."
-                        )
-                        retry_count = 0
-                    else:
-                        logging.info(
-                            f"Retrying... Attempt {retry_count + 1}/{max_retries}"
-                        )
+                    retry_count = 0
+                else:
+                    logging.info(f"Retrying... Attempt {retry_count + 1}/{max_retries}")
 
                 # Scroll and wait for a brief period before retrying
                 scroll_list(driver, site)
-                time.sleep(1.5)
-            time.sleep(1.5)
+                RETRY_PACING.pause()
+                job_cards.update(parse_job_cards(driver.page_source, site))
+
+            yield {**job_cards[job_id], "description": description}
+            CLICK_PACING.pause()
     except Exception as e:
-        retry_count += 1
+        # Raised so the caller leaves the page unfinished in the checkpoint and a
+        # later run scrapes the rest of it
         logging.error(f"Failed to extract job details: {e}")
-        if retry_count >= max_retries:
-            input("Press Return to retry or Ctrl+C to stop.")
-            retry_count = 0
-        else:
-            logging.info(f"Retrying... Attempt {retry_count + 1}/{max_retries}")
+        raise
 
 
 def extract_jobs_from_joblist_old(driver, driver_job_list, job_list, site):
@@ -519,7 +623,7 @@ def extract_jobs_from_joblist_old(driver, driver_job_list, job_list, site):
                     link = driver_job_list[index].find_element(
                         By.CLASS_NAME, site.link_class
                     )
-                    if is_selenium_element_loaded(driver_job_list[index]):
+                    if is_selenium_element_loaded(driver_job_list[index], site):
                         link.click()  # Click the link to load the job description
                         break  # Successful click, break out of the loop
                 except NoSuchElementException:
@@ -619,13 +723,16 @@ def is_valid_url(url):
     return re.match(regex, url) is not None
 
 
-def get_new_filename(keyword, location, file_format, directory="./"):
-    # Create a valid filename
-    filename = f"{keyword}_({location})".replace(" ", "_")
-    filename = re.sub(
-        r"[^\w\s]", "", filename
-    )  # Remove any non-alphanumeric characters
+def get_query_filename(query):
+    # Queries differing only in work type (remote, hybrid, ...) get their own file
+    keywords, location = get_query_labels(query)
+    work_types = parse_qs(urlparse(query).query).get("f_WT", [""])[0].split(",")
+    work_type = "_".join(WORK_TYPES.get(value, value) for value in work_types)
+    filename = f"{keywords}_({location})_{work_type}".replace(" ", "_")
+    return re.sub(r"[^\w\s]", "", filename)  # Remove any non-alphanumeric characters
 
+
+def get_new_filename(filename, file_format, directory="./"):
     existing_files = sorted(
         [f for f in os.listdir(directory) if f.startswith(filename)],
         reverse=True,  # Sort in descending order to handle the highest suffix first
@@ -707,87 +814,411 @@ class Job(BaseModel):
 
 pages = 50
 file_format = "json"
-current_page = 1
-
-driver = set_up_selenium()
+fsync_every = FSYNC_EVERY
+workers = 1  # more than 1 scrapes with that many headless browsers in parallel
+checkpoint_file = CHECKPOINT_FILE
+skip_seen_jobs = True  # skip jobs scraped in earlier runs or under other queries
+seen_jobs_file = SEEN_JOBS_FILE
+index_jobs = True  # add every scraped job to the search index (see jobindex.py)
+job_index_file = JOB_INDEX_FILE
+# "browser" clicks every card; "http" fetches the job pages over HTTP with the
+# browser's cookies and leaves only the pagination to the browser
+description_fetch = "browser"
 
 # Define the required parameters
 required_params = {"f_WT", "geoId", "location", "keywords"}
+# LinkedIn's f_WT values
+WORK_TYPES = {"1": "onsite", "2": "remote", "3": "hybrid"}
 
 # Define the file path
-file_path = "queries.txt"
+queries_file = "queries.txt"
 
-# Check if the file exists
-if not os.path.exists(file_path):
-    logging.error("Error: 'queries.txt' does not exist.")
-    exit(1)
 
-# Read the URLs into a list
-with open(file_path, "r") as file:
-    queries = [line.strip() for line in file if line.strip()]
-
-# Validate URLs and their parameters
-for query in queries:
-    if not is_valid_url(query):
-        logging.error(f"Error: Invalid URL found in queries.txt - {query}")
-        exit(1)
-    parsed_url = urlparse(query)
-    query_params = set(parse_qs(parsed_url.query).keys())
-    if not required_params.issubset(query_params):
-        logging.error(
-            f"Error: The query misses required parameters: {required_params - query_params}"
-        )
+def load_queries(file_path):
+    # Check if the file exists
+    if not os.path.exists(file_path):
+        logging.error(f"Error: '{file_path}' does not exist.")
         exit(1)
 
-# query = "https://www.linkedin.com/jobs/search/?f_WT=2&geoId=91000000&keywords=hr%20manager&location=European%20Union"
+    # Read the URLs into a list
+    with open(file_path, "r") as file:
+        queries = [line.strip() for line in file if line.strip()]
+
+    # Validate URLs and their parameters
+    for query in queries:
+        if not is_valid_url(query):
+            logging.error(f"Error: Invalid URL found in {file_path} - {query}")
+            exit(1)
+        parsed_url = urlparse(query)
+        query_params = set(parse_qs(parsed_url.query).keys())
+        if not required_params.issubset(query_params):
+            logging.error(
+                f"Error: The query misses required parameters: {required_params - query_params}"
+            )
+            exit(1)
+
+    # Queries writing to the same file would overwrite each other's jobs
+    filenames = {}
+    for query in queries:
+        filename = get_query_filename(query)
+        if filename in filenames:
+            logging.error(
+                f"Error: {query} and {filenames[filename]} in {file_path} would "
+                f"write to the same file"
+            )
+            exit(1)
+        filenames[filename] = query
+
+    return queries
+
 
-for index, query in enumerate(queries):
-    # Extract the keywords parameter for the progress bar title
+def get_query_labels(query):
     parsed_url = urlparse(query)
     current_query_params = parse_qs(parsed_url.query)
     keywords = current_query_params.get("keywords", [""])[0].replace("%20", " ")
     location = current_query_params.get("location", [""])[0].replace("%20", " ")
-    progress_bar_description = f"{keywords} ({location})"
-    file_name = get_new_filename(keywords, location, file_format)
+    return keywords, location
 
-    site = LinkedIn(query)
-    if index == 0:
-        log_in(driver, site)
 
-    total_results = prepare_search_results_page(driver, site, current_page)
+def calculate_total_pages(total_results):
     max_pages = total_results // 25 + (1 if total_results % 25 != 0 else 0)
     total_pages = min(pages, max_pages)
     max_results = total_pages * 25
     if total_pages < max_pages:
         total_results = min(max_results, total_results)
+    return total_pages, total_results
+
+
+def open_query_sink(file_name, append=False):
+    # JSON output is appended to a JSON Lines staging file and finalized per query
+    if file_format == "json":
+        return open_sink(
+            staging_filename(file_name), fsync_every=fsync_every, append=append
+        )
+    return open_sink(file_name, fsync_every=fsync_every, append=append)
+
+
+def close_query_sink(sink, file_name, keep=False):
+    if file_format == "json":
+        sink.finalize(file_name, keep=keep)
+    else:
+        sink.close()
+
+
+def resume_or_open_query_sink(checkpoints, query):
+    checkpoint = checkpoints.get(query)
+    if checkpoint:
+        # Pick up where the last run stopped, in the same output file
+        file_name = checkpoint["file_name"]
+        sink = open_query_sink(file_name, append=True)
+        checkpoints.job_ids(query).update(job["id"] for job in sink.read_records())
+        logging.info(
+            f"Resuming {query} into {file_name} with {len(checkpoints.job_ids(query))} jobs"
+        )
+    else:
+        file_name = get_new_filename(get_query_filename(query), file_format)
+        checkpoints.start(query, file_name)
+        sink = open_query_sink(file_name)
+    return file_name, sink
+
+
+def scrape_page(
+    driver,
+    site,
+    total_results,
+    page,
+    navigate=True,
+    known_job_ids=None,
+    seen_jobs=None,
+    fetcher=None,
+):
+    # The first page is already loaded by the call that counted the results
+    if navigate:
+        prepare_search_results_page(driver, site, page)
+
+    # Load search results for the current page
+    driver_job_list, job_cards = load_search_results(driver, site, total_results, page)
+
+    if fetcher is not None:
+        yield from fetch_jobs_from_cards(fetcher, job_cards, known_job_ids, seen_jobs)
+    else:
+        yield from extract_jobs_from_joblist(
+            driver, driver_job_list, job_cards, site, known_job_ids, seen_jobs
+        )
+
+
+def open_seen_jobs():
+    return SeenJobs(seen_jobs_file) if skip_seen_jobs else None
+
 
-    jobs = []
-    # Initialize the progress bar
-    progress_bar = tqdm(total=total_results, desc=progress_bar_description)
+def open_job_index():
+    return JobIndex(job_index_file) if index_jobs else None
 
-    for page in range(1, total_pages + 1):
-        if page < 1:
-            site.update_query(page)
-            prepare_search_results_page(driver, site, page)
 
-        # Load search results for the current page
-        driver_job_list, job_list = load_search_results(
-            driver, site, total_results, page
+def open_fetcher(driver, site):
+    if description_fetch == "http":
+        return DescriptionFetcher.from_driver(driver, site)
+    return None
+
+
+def scrape_queries(queries):
+    driver = set_up_selenium()
+    checkpoints = CheckpointStore(checkpoint_file)
+    seen_jobs = open_seen_jobs()
+    job_index = open_job_index()
+    fetcher = None
+
+    for index, query in enumerate(queries):
+        # Extract the keywords parameter for the progress bar title
+        keywords, location = get_query_labels(query)
+        progress_bar_description = f"{keywords} ({location})"
+
+        site = LinkedIn(query)
+        if index == 0:
+            log_in(driver, site)
+            fetcher = open_fetcher(driver, site)
+
+        file_name, sink = resume_or_open_query_sink(checkpoints, query)
+        known_job_ids = checkpoints.job_ids(query)
+
+        first_page = checkpoints.first_pending_page(query)
+        total_results = prepare_search_results_page(driver, site, first_page)
+        total_pages, total_results = calculate_total_pages(total_results)
+
+        # Initialize the progress bar
+        progress_bar = tqdm(
+            total=total_results,
+            initial=len(known_job_ids),
+            desc=progress_bar_description,
         )
 
-        for job in extract_jobs_from_joblist(driver, driver_job_list, job_list, site):
-            jobs.append(job)
-            # Update the progress bar with the number of processed jobs
-            progress_bar.update(1)
-            progress_bar.set_postfix_str(
-                f"Processed Jobs: {len(jobs)} / {total_results}, Page: {page}/{total_pages}"
+        failed = False
+        for page in checkpoints.pending_pages(query, total_pages):
+            try:
+                for job in scrape_page(
+                    driver,
+                    site,
+                    total_results,
+                    page,
+                    navigate=page != first_page,
+                    known_job_ids=known_job_ids,
+                    seen_jobs=seen_jobs,
+                    fetcher=fetcher,
+                ):
+                    sink.write(job)
+                    checkpoints.add_job(query, job["id"])
+                    if seen_jobs is not None:
+                        seen_jobs.add(job)
+                    if job_index is not None:
+                        job_index.add(job)
+                    # Update the progress bar with the number of processed jobs
+                    progress_bar.update(1)
+                    progress_bar.set_postfix_str(
+                        f"Processed Jobs: {len(known_job_ids)} / {total_results}, Page: {page}/{total_pages}"
+                    )
+                ok = True
+            except Exception as e:
+                logging.error(f"Failed to scrape page {page} of {query}: {e}")
+                ok = False
+                failed = True
+            # The jobs written so far are kept either way; only a finished page
+            # is checkpointed as done
+            sink.sync()
+            if ok:
+                checkpoints.complete_page(query, page)
+            if seen_jobs is not None:
+                seen_jobs.commit()
+            if job_index is not None:
+                job_index.commit()
+            PAGE_PACING.pause()
+
+        # With a failed page the checkpoint stays, so the next run retries it
+        close_query_sink(sink, file_name, keep=failed)
+        if not failed:
+            checkpoints.finish(query)
+
+        # Close the progress bar after all jobs are processed
+        progress_bar.close()
+        print("\033[92m" + f"Saved jobs to {file_name}" + "\033[0m")
+        # User confirmation to proceed
+        if index != len(queries) - 1:
+            input("Press Return to continue to the next query, or Ctrl+C to stop.")
+
+    if seen_jobs is not None:
+        seen_jobs.close()
+    if job_index is not None:
+        job_index.close()
+    if fetcher is not None:
+        fetcher.close()
+
+
+class QueryRun:
+    """Shared state of one query while its pages are spread over the workers."""
+
+    def __init__(self, query, position, checkpoints, seen_jobs=None, job_index=None):
+        self.query = query
+        self.position = position
+        self.checkpoints = checkpoints
+        self.seen_jobs = seen_jobs
+        self.job_index = job_index
+        self.file_name, self.sink = resume_or_open_query_sink(checkpoints, query)
+        self.known_job_ids = checkpoints.job_ids(query)
+        self.first_page = checkpoints.first_pending_page(query)
+        self.lock = threading.Lock()
+        self.total_results = None
+        self.total_pages = None
+        self.pending_pages = 1  # the first page, which plans the rest
+        self.failed = False
+        self.progress_bar = None
+
+    def plan(self, total_results):
+        total_pages, total_results = calculate_total_pages(total_results)
+        keywords, location = get_query_labels(self.query)
+        remaining_pages = [
+            page
+            for page in self.checkpoints.pending_pages(self.query, total_pages)
+            if page != self.first_page
+        ]
+        with self.lock:
+            self.total_results = total_results
+            self.total_pages = total_pages
+            self.pending_pages += len(remaining_pages)
+            self.progress_bar = tqdm(
+                total=total_results,
+                initial=len(self.known_job_ids),
+                desc=f"{keywords} ({location})",
+                position=self.position,
             )
-            save_file(jobs, file_name)
-        time.sleep(5)
-
-    # Close the progress bar after all jobs are processed
-    progress_bar.close()
-    print("\033[92m" + f"Saved jobs to {file_name}" + "\033[0m")
-    # User confirmation to proceed
-    if index != len(queries) - 1:
-        input("Press Return to continue to the next query, or Ctrl+C to stop.")
+        return remaining_pages
+
+    def write(self, job):
+        with self.lock:
+            self.sink.write(job)
+            self.checkpoints.add_job(self.query, job["id"])
+            if self.seen_jobs is not None:
+                self.seen_jobs.add(job)
+            if self.job_index is not None:
+                self.job_index.add(job)
+            self.progress_bar.update(1)
+
+    def page_done(self, page, ok):
+        with self.lock:
+            if ok:
+                self.sink.sync()
+                self.checkpoints.complete_page(self.query, page)
+                if self.seen_jobs is not None:
+                    self.seen_jobs.commit()
+                if self.job_index is not None:
+                    self.job_index.commit()
+            else:
+                self.failed = True
+            self.pending_pages -= 1
+            if self.pending_pages:
+                return
+            # With a failed page the checkpoint stays, so the next run retries it
+            close_query_sink(self.sink, self.file_name, keep=self.failed)
+            if not self.failed:
+                self.checkpoints.finish(self.query)
+            if self.progress_bar is not None:
+                self.progress_bar.close()
+        print("\033[92m" + f"Saved jobs to {self.file_name}" + "\033[0m")
+
+
+def scrape_worker(tasks, login_query):
+    # Every worker runs its own browser session with its own login
+    driver = set_up_selenium(headless=True)
+    sites = {}
+    fetcher = None
+    try:
+        login_site = LinkedIn(login_query)
+        log_in(driver, login_site)
+        fetcher = open_fetcher(driver, login_site)
+        while True:
+            task = tasks.get()
+            if task is None:
+                tasks.task_done()
+                break
+
+            run, page = task
+            ok = False
+            try:
+                if run.query not in sites:
+                    sites[run.query] = LinkedIn(run.query)
+                site = sites[run.query]
+
+                if page == run.first_page:
+                    total_results = prepare_search_results_page(driver, site, page)
+                    for next_page in run.plan(total_results):
+                        tasks.put((run, next_page))
+
+                for job in scrape_page(
+                    driver,
+                    site,
+                    run.total_results,
+                    page,
+                    navigate=page != run.first_page,
+                    known_job_ids=run.known_job_ids,
+                    seen_jobs=run.seen_jobs,
+                    fetcher=fetcher,
+                ):
+                    run.write(job)
+                ok = True
+                PAGE_PACING.pause()
+            except Exception as e:
+                logging.error(f"Failed to scrape page {page} of {run.query}: {e}")
+            finally:
+                run.page_done(page, ok)
+                tasks.task_done()
+    finally:
+        if fetcher is not None:
+            fetcher.close()
+        driver.quit()
+
+
+def scrape_queries_parallel(queries, workers):
+    tasks = queue.Queue()
+    checkpoints = CheckpointStore(checkpoint_file)
+    seen_jobs = open_seen_jobs()
+    job_index = open_job_index()
+
+    # Each query starts as a single task for its first pending page; that task
+    # counts the results and queues the other pages for whichever worker is free
+    for index, query in enumerate(queries):
+        run = QueryRun(query, index, checkpoints, seen_jobs, job_index)
+        tasks.put((run, run.first_page))
+
+    threads = [
+        threading.Thread(
+            target=scrape_worker, args=(tasks, queries[0]), name=f"worker-{i}"
+        )
+        for i in range(min(workers, len(queries) * pages))
+    ]
+    for thread in threads:
+        thread.start()
+
+    # Wait for the queue to drain, unless every worker died (e.g. a failed login)
+    while tasks.unfinished_tasks and any(thread.is_alive() for thread in threads):
+        time.sleep(1)
+    for _ in threads:
+        tasks.put(None)
+    for thread in threads:
+        thread.join()
+
+    if seen_jobs is not None:
+        seen_jobs.close()
+    if job_index is not None:
+        job_index.close()
+
+
+def main():
+    queries = load_queries(queries_file)
+    # query = "https://www.linkedin.com/jobs/search/?f_WT=2&geoId=91000000&keywords=hr%20manager&location=European%20Union"
+
+    if workers > 1:
+        scrape_queries_parallel(queries, workers)
+    else:
+        scrape_queries(queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+
+SEEN_JOBS_FILE = "seen_jobs.sqlite"
+
+
+def content_hash(job):
+    content = "\x1f".join(
+        job.get(field) or "" for field in ("title", "company_name", "description")
+    )
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+class SeenJobs:
+    """Persistent index of every job id scraped so far, across runs and queries."""
+
+    def __init__(self, filename=SEEN_JOBS_FILE):
+        self.filename = filename
+        self.lock = threading.Lock()
+        # Shared by the scraper workers, every access goes through the lock
+        self.connection = sqlite3.connect(filename, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS seen_jobs (
+                job_id TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL
+            ) WITHOUT ROWID
+            """
+        )
+        self.connection.commit()
+
+    def __contains__(self, job_id):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT 1 FROM seen_jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return row is not None
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM seen_jobs").fetchone()[0]
+
+    def touch(self, job_id):
+        with self.lock:
+            self.connection.execute(
+                "UPDATE seen_jobs SET last_seen = ? WHERE job_id = ?",
+                (time.time(), job_id),
+            )
+
+    def add(self, job):
+        now = time.time()
+        with self.lock:
+            self.connection.execute(
+                """
+                INSERT INTO seen_jobs (job_id, content_hash, first_seen, last_seen)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(job_id) DO UPDATE SET
+                    content_hash = excluded.content_hash,
+                    last_seen = excluded.last_seen
+                """,
+                (job["id"], content_hash(job), now, now),
+            )
+
+    def commit(self):
+        # Called once per page rather than per job
+        with self.lock:
+            self.connection.commit()
+
+    def close(self):
+        self.commit()
+        with self.lock:
+            self.connection.close()
+        logging.info(f"Closed seen jobs index {self.filename}")
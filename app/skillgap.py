@@ -0,0 +1,180 @@
+import argparse
+import logging
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from pipeline import SILVER_DIRECTORY, SKILLS_DATASET
+from skillmatcher import CURATED_SKILLS, SkillMatcher
+
+SKILL_MATRIX_FILE = "skill_matrix.npz"
+MIN_POSTINGS = 2  # skills in fewer postings of a role are left out of its row
+TOP_SKILLS = 20
+
+
+def canonical_names(names, curated=CURATED_SKILLS):
+    """Map extracted skill names onto one spelling: the curated name when the name
+    is a curated skill or alias, else its most common spelling."""
+    names = names.astype("string").str.strip()
+    lower = names.str.lower()
+    aliases = {
+        phrase.lower(): skill
+        for skill, phrases in curated.items()
+        for phrase in [skill, *phrases]
+    }
+    spelling = names.groupby(lower).agg(lambda s: s.mode().iloc[0])
+    return lower.map(lambda name: aliases.get(name, spelling.get(name)))
+
+
+class SkillGapScorer:
+    """Role × skill demand matrix: the share of a role's postings asking for each
+    skill, and that share weighted by how specific the skill is to the role
+    (smoothed idf over roles). Scoring a resume only matches it against the
+    skill lexicon and reads one sparse row."""
+
+    def __init__(self, roles, skills, demand, postings):
+        self.roles = list(roles)
+        self.skills = list(skills)
+        self.demand = sparse.csr_matrix(demand)
+        self.demand.sort_indices()
+        self.postings = np.asarray(postings)
+        self.role_rows = {role: row for row, role in enumerate(self.roles)}
+        roles_with_skill = np.bincount(self.demand.indices, minlength=len(self.skills))
+        self.idf = np.log((1 + len(self.roles)) / (1 + roles_with_skill)) + 1
+        self.matcher = SkillMatcher(
+            {skill: CURATED_SKILLS.get(skill, []) for skill in self.skills}
+        )
+
+    @classmethod
+    def from_skills(cls, skills, min_postings=MIN_POSTINGS):
+        """Build from a silver skills frame (role and skills columns)."""
+        mentions = pd.DataFrame(
+            [
+                (row, skill["name"])
+                for row, job_skills in enumerate(skills["skills"])
+                for skill in job_skills
+                if skill["name"]
+            ],
+            columns=["row", "skill"],
+        )
+        mentions["skill"] = canonical_names(mentions["skill"])
+        mentions["role"] = skills["role"].astype("string").to_numpy()[mentions["row"]]
+        # A posting counts once per skill, however often the skill was extracted
+        counts = (
+            mentions.drop_duplicates(["row", "skill"]).groupby(["role", "skill"]).size()
+        )
+        counts = counts[counts >= min_postings]
+        postings = skills.groupby(skills["role"].astype("string")).size()
+
+        roles = postings.index
+        role_codes = roles.get_indexer(counts.index.get_level_values("role"))
+        skill_codes, skill_names = pd.factorize(counts.index.get_level_values("skill"))
+        demand = sparse.csr_matrix(
+            (
+                counts.to_numpy() / postings.to_numpy()[role_codes],
+                (role_codes, skill_codes),
+            ),
+            shape=(len(roles), len(skill_names)),
+        )
+        return cls(roles, skill_names, demand, postings.to_numpy())
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            roles=np.array(self.roles, dtype=str),
+            skills=np.array(self.skills, dtype=str),
+            postings=self.postings,
+            data=self.demand.data,
+            indices=self.demand.indices,
+            indptr=self.demand.indptr,
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            roles, skills = data["roles"].tolist(), data["skills"].tolist()
+            demand = sparse.csr_matrix(
+                (data["data"], data["indices"], data["indptr"]),
+                shape=(len(roles), len(skills)),
+            )
+            return cls(roles, skills, demand, data["postings"])
+
+    def resume_skills(self, resume_text):
+        return {skill for skill, _, _ in self.matcher.find(resume_text)}
+
+    def score(self, resume_text, role, top=TOP_SKILLS):
+        """The skills of a role missing from a resume, most demanded first.
+
+        Returns (coverage, missing): the demand-weighted share of the role's
+        skills the resume has, and a frame of the top missing skills with their
+        demand (share of postings) and tfidf weight.
+        """
+        if role not in self.role_rows:
+            raise KeyError(
+                f"No skills for role {role!r}; known: {', '.join(self.roles)}"
+            )
+        row = self.role_rows[role]
+        start, end = self.demand.indptr[row], self.demand.indptr[row + 1]
+        columns = self.demand.indices[start:end]
+        demand = self.demand.data[start:end]
+        tfidf = demand * self.idf[columns]
+
+        found = self.resume_skills(resume_text)
+        has = np.array([self.skills[column] in found for column in columns], dtype=bool)
+        coverage = demand[has].sum() / demand.sum() if len(demand) else 0.0
+        order = np.argsort(-demand[~has], kind="stable")[:top]
+        missing = pd.DataFrame(
+            {
+                "skill": [self.skills[column] for column in columns[~has][order]],
+                "demand": demand[~has][order],
+                "tfidf": tfidf[~has][order],
+            }
+        )
+        return float(coverage), missing
+
+
+def build_skill_matrix(silver_directory=SILVER_DIRECTORY, min_postings=MIN_POSTINGS):
+    """Rebuild the demand matrix from the silver skills dataset and save it."""
+    skills = pd.read_parquet(
+        os.path.join(silver_directory, SKILLS_DATASET), columns=["role", "skills"]
+    )
+    scorer = SkillGapScorer.from_skills(skills, min_postings)
+    path = os.path.join(silver_directory, SKILL_MATRIX_FILE)
+    scorer.save(path)
+    logging.info(
+        f"Skill matrix: {len(scorer.roles)} roles × {len(scorer.skills)} skills "
+        f"({scorer.demand.nnz} entries) from {len(skills)} postings, saved to {path}"
+    )
+    return scorer
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(
+        description="List the skills a resume is missing for a role."
+    )
+    parser.add_argument("resume", help="plain text resume")
+    parser.add_argument("role", help="role partition, e.g. data_engineer")
+    parser.add_argument("--top", type=int, default=TOP_SKILLS)
+    parser.add_argument("--silver", default=SILVER_DIRECTORY)
+    parser.add_argument("--rebuild", action="store_true", help="rebuild the matrix")
+    args = parser.parse_args()
+
+    path = os.path.join(args.silver, SKILL_MATRIX_FILE)
+    if args.rebuild or not os.path.exists(path):
+        build_skill_matrix(args.silver)
+    with open(args.resume, "r") as file:
+        resume_text = file.read()
+
+    scorer = SkillGapScorer.load(path)
+    start = time.perf_counter()
+    coverage, missing = scorer.score(resume_text, args.role, args.top)
+    elapsed = time.perf_counter() - start
+    print(f"Covers {coverage:.0%} of the demand for {args.role} skills. Missing:")
+    print(missing.to_string(index=False))
+    logging.info(f"Scored in {elapsed * 1000:.1f} ms")
@@ -0,0 +1,232 @@
+import bisect
+import collections
+import glob
+import logging
+import os
+import re
+
+import pandas as pd
+
+# Skills that are named the same way in almost every posting, with the other
+# spellings they go by. Ambiguous short names (R, Go, Excel as a verb) are left out.
+CURATED_SKILLS = {
+    "Python": [],
+    "SQL": [],
+    "NoSQL": [],
+    "PostgreSQL": ["postgres"],
+    "MySQL": [],
+    "SQL Server": ["mssql", "ms sql", "t-sql", "tsql"],
+    "Oracle": [],
+    "MongoDB": ["mongo"],
+    "Cassandra": [],
+    "Redis": [],
+    "Elasticsearch": ["elastic search"],
+    "Snowflake": [],
+    "BigQuery": ["big query"],
+    "Redshift": ["amazon redshift"],
+    "Databricks": [],
+    "Spark": ["apache spark"],
+    "PySpark": [],
+    "Hadoop": ["hdfs"],
+    "Hive": [],
+    "Kafka": ["apache kafka"],
+    "Flink": ["apache flink"],
+    "Airflow": ["apache airflow"],
+    "dbt": ["data build tool"],
+    "Dagster": [],
+    "Prefect": [],
+    "Informatica": [],
+    "Talend": [],
+    "Azure Data Factory": ["adf"],
+    "Synapse": ["azure synapse"],
+    "AWS": ["amazon web services"],
+    "Azure": ["microsoft azure"],
+    "GCP": ["google cloud", "google cloud platform"],
+    "AWS Glue": [],
+    "AWS Lambda": [],
+    "S3": ["amazon s3"],
+    "EMR": ["amazon emr"],
+    "Kinesis": [],
+    "Docker": [],
+    "Kubernetes": ["k8s"],
+    "Terraform": [],
+    "CI/CD": ["ci / cd", "continuous integration"],
+    "Git": ["github", "gitlab"],
+    "Jenkins": [],
+    "Linux": [],
+    "Java": [],
+    "Scala": [],
+    "JavaScript": ["js"],
+    "TypeScript": [],
+    "C++": [],
+    "C#": [],
+    "Rust": [],
+    "Kotlin": [],
+    "Bash": ["shell scripting"],
+    "Pandas": [],
+    "NumPy": [],
+    "scikit-learn": ["sklearn", "scikit learn"],
+    "TensorFlow": [],
+    "PyTorch": [],
+    "Machine Learning": ["ml"],
+    "Deep Learning": [],
+    "NLP": ["natural language processing"],
+    "MLOps": [],
+    "ETL": ["elt"],
+    "Data Modeling": ["data modelling", "dimensional modeling"],
+    "Data Warehousing": ["data warehouse", "dwh"],
+    "Data Lake": ["lakehouse", "delta lake"],
+    "Data Governance": [],
+    "Data Quality": [],
+    "Tableau": [],
+    "Power BI": ["powerbi"],
+    "Looker": [],
+    "Microsoft Excel": ["ms excel"],
+    "REST APIs": ["rest api", "restful"],
+    "GraphQL": [],
+    "Microservices": [],
+    "Agile": ["agile methodologies", "agile methodology"],
+    "Scrum": [],
+    "Kanban": [],
+    "Jira": [],
+    "Confluence": [],
+    "Figma": [],
+    "A/B Testing": ["a/b tests", "ab testing", "experimentation"],
+    "Product Management": [],
+    "Product Strategy": [],
+    "Roadmapping": ["product roadmap", "roadmap"],
+    "Stakeholder Management": [],
+    "Market Research": [],
+    "User Research": ["ux research"],
+    "Product Analytics": [],
+    "Go-to-Market": ["go to market", "gtm"],
+    "OKRs": ["okr"],
+    "SaaS": [],
+}
+LEARNED_MIN_COUNT = 2  # silver skill names seen at least this often join the lexicon
+MIN_MATCHED_SKILLS = 8  # postings with fewer matches still go to the LLM
+
+# Lowercase word tokens; keeps "c++", "c#", "node.js" and "ci/cd" together
+TOKEN_RE = re.compile(r"[a-z0-9](?:[a-z0-9+#]|[./-](?=[a-z0-9]))*", re.I)
+SENTENCE_RE = re.compile(r"[^.!?\n]+[.!?]?")
+
+
+def tokenize(text):
+    return [
+        (match.group().lower(), match.start(), match.end())
+        for match in TOKEN_RE.finditer(text)
+    ]
+
+
+class SkillMatcher:
+    """Aho-Corasick automaton over word tokens: finds every lexicon phrase in a
+    description in one pass, whatever the size of the lexicon."""
+
+    def __init__(self, lexicon):
+        # Node 0 is the root; goto[node] maps a token to the next node, and
+        # outputs[node] holds (skill, phrase length) for the phrases ending there
+        self.goto = [{}]
+        self.fail = [0]
+        self.outputs = [[]]
+        for skill, phrases in lexicon.items():
+            for phrase in {skill, *phrases}:
+                self._add(phrase, skill)
+        self._link()
+
+    def _add(self, phrase, skill):
+        tokens = [token for token, _, _ in tokenize(phrase)]
+        if not tokens:
+            return
+        node = 0
+        for token in tokens:
+            if token not in self.goto[node]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.outputs.append([])
+                self.goto[node][token] = len(self.goto) - 1
+            node = self.goto[node][token]
+        self.outputs[node].append((skill, len(tokens)))
+
+    def _link(self):
+        queue = collections.deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for token, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and token not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(token, 0)
+                if self.fail[child] == child:
+                    self.fail[child] = 0
+                self.outputs[child] = (
+                    self.outputs[child] + self.outputs[self.fail[child]]
+                )
+
+    @classmethod
+    def from_silver(
+        cls, skills_directory, curated=CURATED_SKILLS, min_count=LEARNED_MIN_COUNT
+    ):
+        """Curated skills plus the skill names the LLM extracted at least min_count
+        times, read from the silver skills dataset when it exists."""
+        lexicon = {skill: list(phrases) for skill, phrases in curated.items()}
+        # The directory exists with only _staging/ before the first partition
+        if not glob.glob(
+            os.path.join(skills_directory, "role=*", "**", "*.parquet"), recursive=True
+        ):
+            return cls(lexicon)
+
+        skills = pd.read_parquet(skills_directory, columns=["skills"])["skills"]
+        names = pd.Series(
+            [skill["name"] for row in skills for skill in row if skill["name"]],
+            dtype="string",
+        ).str.strip()
+        counts = names.str.lower().value_counts()
+        # Keep the most common spelling of each name
+        spelling = names.groupby(names.str.lower()).agg(lambda s: s.mode().iloc[0])
+        known = {
+            phrase.lower()
+            for skill, phrases in lexicon.items()
+            for phrase in [skill, *phrases]
+        }
+        learned = [
+            spelling[name]
+            for name in counts[counts >= min_count].index
+            if name not in known
+        ]
+        for name in learned:
+            lexicon[name] = []
+        logging.info(f"Skill lexicon: {len(curated)} curated, {len(learned)} learned")
+        return cls(lexicon)
+
+    def find(self, text):
+        """Yield (skill, start, end) for every lexicon phrase in text."""
+        tokens = tokenize(text)
+        node = 0
+        for position, (token, _, end) in enumerate(tokens):
+            while node and token not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(token, 0)
+            for skill, length in self.outputs[node]:
+                yield skill, tokens[position - length + 1][1], end
+
+    def match(self, text):
+        """Skills in text as silver skills records, the reference_text being the
+        sentence of the first mention of each skill."""
+        if not isinstance(text, str):
+            return []
+        sentences = [
+            (match.start(), match.end()) for match in SENTENCE_RE.finditer(text)
+        ]
+        starts = [start for start, _ in sentences]
+        skills = {}
+        for skill, start, _ in self.find(text):
+            if skill in skills:
+                continue
+            index = bisect.bisect_right(starts, start) - 1
+            sentence_start, sentence_end = sentences[index]
+            skills[skill] = text[sentence_start:sentence_end].strip()
+        return [
+            {"name": skill, "reference_text": reference_text}
+            for skill, reference_text in skills.items()
+        ]
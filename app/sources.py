@@ -0,0 +1,156 @@
+import glob
+import hashlib
+import io
+import os
+
+import pandas as pd
+
+# The columns of sqlingest.Job, which every adapter normalizes to
+JOB_COLUMNS = [
+    "job_id",
+    "job_title",
+    "company_name",
+    "location",
+    "job_link",
+    "job_description",
+]
+# Carried into silver when a source has them; sqlingest only keeps JOB_COLUMNS
+EXTRA_COLUMNS = ["salary", "experience_level"]
+BRONZE_DIRECTORY = "./data/bronze"
+BRONZE_PATTERNS = ("**/*.csv", "**/*.json")
+
+ADAPTERS = {}
+
+
+def source_adapter(name, *columns):
+    """Register a function that normalizes bronze files whose header has these columns.
+
+    Adapters are tried in registration order, so register the more specific ones first.
+    """
+
+    def register(func):
+        ADAPTERS[name] = (frozenset(columns), func)
+        return func
+
+    return register
+
+
+def find_adapter(columns):
+    for name, (required_columns, adapter) in ADAPTERS.items():
+        if required_columns.issubset(columns):
+            return name, adapter
+    return None, None
+
+
+@source_adapter("marco_script", "job_id", "job_title", "job_description")
+def marco_script(df):
+    return df
+
+
+@source_adapter("marco_script_scrapejobs", "id", "title", "company_name", "link")
+def marco_script_scrapejobs(df):
+    # The JSON written by app/scrapejobs.py
+    return df.rename(
+        columns={
+            "id": "job_id",
+            "title": "job_title",
+            "link": "job_link",
+            "description": "job_description",
+        }
+    )
+
+
+@source_adapter("apify_linkedin", "companyName", "jobUrl", "title")
+def apify_linkedin(df):
+    # .../jobs/view/remote-data-engineers-at-sonitalent-corp-3758444106?trk=...
+    job_id = df["jobUrl"].str.extract(r"(\d+)/?(?:\?|$)", expand=False)
+    return pd.DataFrame(
+        {
+            "job_id": job_id,
+            "job_title": df["title"],
+            "company_name": df["companyName"],
+            "location": df["location"],
+            "job_link": df["jobUrl"],
+            "job_description": df["description"],
+            "salary": df["salary"],
+            "experience_level": df["experienceLevel"],
+        }
+    )
+
+
+@source_adapter("apify_indeed", "positionName", "company", "url")
+def apify_indeed(df):
+    return pd.DataFrame(
+        {
+            "job_id": df["id"],
+            "job_title": df["positionName"],
+            "company_name": df["company"],
+            "location": df["location"],
+            "job_link": df["url"],
+            "job_description": df["description"],
+            "salary": df["salary"],
+        }
+    )
+
+
+@source_adapter("marco_script_old", "Job Title", "Company Name", "Location")
+def marco_script_old(df):
+    df = df.rename(
+        columns={
+            "Job Title": "job_title",
+            "Company Name": "company_name",
+            "Location": "location",
+        }
+    )
+    # The exports end in rows of empty cells, which would all get the same id
+    df = df.dropna(subset=["job_title", "company_name", "location"], how="all")
+    # These early exports have no job id, derive a stable one from the row
+    key = (
+        df["job_title"].fillna("")
+        + "\x1f"
+        + df["company_name"].fillna("")
+        + "\x1f"
+        + df["location"].fillna("")
+    )
+    df["job_id"] = "sha1:" + key.map(
+        lambda value: hashlib.sha1(value.encode("utf-8")).hexdigest()
+    )
+    return df
+
+
+def find_bronze_files(directory=BRONZE_DIRECTORY):
+    paths = set()
+    for pattern in BRONZE_PATTERNS:
+        paths.update(glob.glob(os.path.join(directory, pattern), recursive=True))
+    return sorted(paths)
+
+
+def read_bronze(data, path):
+    """Parse the raw bytes of a bronze file into a DataFrame of strings."""
+    if path.endswith(".csv"):
+        # Apify exports start with a byte order mark
+        return pd.read_csv(io.BytesIO(data), dtype=str, encoding="utf-8-sig")
+    # Scraper output is a JSON array, older dumps are JSON Lines
+    lines = not data.lstrip().startswith(b"[")
+    return pd.read_json(io.BytesIO(data), lines=lines, dtype=False).astype(
+        object
+    )
+
+
+def load_bronze_file(path, known_sha256=None):
+    """Read, hash and normalize one bronze file; safe to run in a worker process.
+
+    Returns (sha256, adapter name, DataFrame with JOB_COLUMNS and EXTRA_COLUMNS). The DataFrame is
+    None when the content hash equals known_sha256, i.e. the file is unchanged.
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    sha256 = hashlib.sha256(data).hexdigest()
+    if sha256 == known_sha256:
+        return sha256, None, None
+
+    df = read_bronze(data, path)
+    name, adapter = find_adapter(set(df.columns))
+    if adapter is None:
+        raise ValueError(f"No source adapter for {path} (columns: {list(df.columns)})")
+    return sha256, name, adapter(df).reindex(columns=JOB_COLUMNS + EXTRA_COLUMNS)
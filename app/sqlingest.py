@@ -1,17 +1,32 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
 from typing import Optional
+import logging
+import sys
+import time
 
-from sqlmodel import Field, SQLModel, Session, create_engine
+from sqlalchemy import bindparam, delete, func, insert, inspect, select, text, update
+from sqlmodel import AutoString, Field, SQLModel, Session, create_engine
 from dotenv import load_dotenv
 import os
 import pandas as pd
+from sources import BRONZE_DIRECTORY, find_bronze_files, load_bronze_file
 load_dotenv()
 
 dbstring = os.getenv("dbstring")
 
+DEFAULT_CSV_FILE = "./data/bronze/marco_script/linkedin/head_of_product/jobs_Head_of_Product_-_European_Union_-_Remote_-_LinkedIn.csv"
+CHUNK_SIZE = 1000  # rows per statement batch; keeps IN (...) under MSSQL's 2100 parameters
+# MSSQL can't index VARCHAR(max), so the key columns need a length
+JOB_ID_LENGTH = 64  # LinkedIn ids and the "sha1:" ids of the old exports fit
+PATH_LENGTH = 450  # 900 bytes, MSSQL's limit for a primary key
+
 
 class Job(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    job_id: str
+    job_id: str = Field(
+        index=True, unique=True, sa_type=AutoString(length=JOB_ID_LENGTH)
+    )
     job_title: Optional[str]
     company_name: Optional[str] = None
     location: Optional[str] = None
@@ -19,21 +34,208 @@ class Job(SQLModel, table=True):
     job_description: Optional[str] = None
 
 
-engine = create_engine(dbstring, echo=True)
+class BronzeFile(SQLModel, table=True):
+    """A bronze file as it was last ingested, so unchanged files can be skipped."""
+
+    path: str = Field(primary_key=True, sa_type=AutoString(length=PATH_LENGTH))
+    mtime: float
+    size: int
+    sha256: str
+    adapter: Optional[str] = None
+    rows: int = 0
+    ingested_at: datetime
+
+
+JOB_COLUMNS = [column for column in Job.__table__.columns.keys() if column != "id"]
+
+engine = create_engine(dbstring, echo=False)
 
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
+    ensure_unique_job_ids()
+
+
+def ensure_unique_job_ids():
+    """Give a job table created before job_id was unique its unique index, which
+    the upsert relies on. Duplicate job_ids are removed first, keeping the row
+    inserted last, and on MSSQL the VARCHAR(max) job_id is given its length."""
+    inspector = inspect(engine)
+    unique_columns = [
+        index["column_names"]
+        for index in inspector.get_indexes("job")
+        if index["unique"]
+    ] + [
+        constraint["column_names"]
+        for constraint in inspector.get_unique_constraints("job")
+    ]
+    if ["job_id"] in unique_columns:
+        return
+
+    table = Job.__table__
+    (job_id_index,) = [index for index in table.indexes if index.name == "ix_job_job_id"]
+    existing = {index["name"] for index in inspector.get_indexes("job")}
+    (job_id_type,) = [
+        column["type"]
+        for column in inspector.get_columns("job")
+        if column["name"] == "job_id"
+    ]
+    with engine.begin() as connection:
+        if connection.dialect.name == "mssql" and job_id_type.length is None:
+            column_type = table.c.job_id.type.compile(dialect=connection.dialect)
+            connection.execute(
+                text(f"ALTER TABLE job ALTER COLUMN job_id {column_type} NOT NULL")
+            )
+        latest = (
+            select(func.max(table.c.id)).group_by(table.c.job_id).scalar_subquery()
+        )
+        removed = connection.execute(delete(table).where(table.c.id.not_in(latest)))
+        if job_id_index.name in existing:
+            # A non-unique index of the same name, e.g. made by hand
+            job_id_index.drop(connection)
+        job_id_index.create(connection)
+    logging.info(f"Made job_id unique, removing {removed.rowcount} duplicate jobs")
+
+
+def chunk_to_rows(chunk):
+    """Turn a DataFrame chunk into Job rows, one per job_id, with None for missing values."""
+    chunk = chunk.reindex(columns=JOB_COLUMNS)
+    chunk = chunk.dropna(subset=["job_id"]).drop_duplicates("job_id", keep="last")
+    chunk["job_id"] = chunk["job_id"].astype(str)
+    chunk = chunk.astype(object).where(chunk.notna(), None)
+    return chunk.to_dict(orient="records")
+
+
+def upsert_jobs(session, rows):
+    """Insert new jobs and update existing ones, keyed on job_id, in bulk."""
+    table = Job.__table__
+    dialect = session.get_bind().dialect.name
+
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        statement = dialect_insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.job_id],
+            set_={
+                column: statement.excluded[column]
+                for column in JOB_COLUMNS
+                if column != "job_id"
+            },
+        )
+        session.execute(statement, rows)
+        return
+
+    # No portable upsert (e.g. MSSQL): split the chunk on the ids that already exist
+    job_ids = [row["job_id"] for row in rows]
+    existing = set(session.scalars(select(table.c.job_id).where(table.c.job_id.in_(job_ids))))
+    new_rows = [row for row in rows if row["job_id"] not in existing]
+    changed_rows = [
+        {**row, "existing_job_id": row["job_id"]}
+        for row in rows
+        if row["job_id"] in existing
+    ]
+    if new_rows:
+        session.execute(insert(table), new_rows)
+    if changed_rows:
+        session.execute(
+            update(table).where(table.c.job_id == bindparam("existing_job_id")),
+            changed_rows,
+        )
+
+
+def upsert_dataframe(session, df, chunksize=CHUNK_SIZE):
+    total = 0
+    for start in range(0, len(df), chunksize):
+        rows = chunk_to_rows(df.iloc[start : start + chunksize])
+        if rows:
+            upsert_jobs(session, rows)
+        total += len(rows)
+    return total
+
+
+def log_rate(total, source, start):
+    elapsed = time.perf_counter() - start
+    logging.info(
+        f"Loaded {total} jobs from {source} in {elapsed:.2f}s "
+        f"({total / elapsed if elapsed else 0:.0f} rows/s)"
+    )
+
+
+def create_jobs(csv_file=DEFAULT_CSV_FILE, chunksize=CHUNK_SIZE):
+    start = time.perf_counter()
+    total = 0
+    with Session(engine) as session:
+        for chunk in pd.read_csv(csv_file, chunksize=chunksize, dtype={"job_id": str}):
+            rows = chunk_to_rows(chunk)
+            if rows:
+                upsert_jobs(session, rows)
+                session.commit()
+            total += len(rows)
+    log_rate(total, csv_file, start)
+    return total
+
+
+def ingest_bronze(directory=BRONZE_DIRECTORY, max_workers=None):
+    """Load every new or changed bronze file under directory into the Job table.
+
+    Files are parsed and normalized in a process pool; only this process writes to
+    the database. A file is skipped when its mtime and size are unchanged, or when
+    they changed but its content hash did not.
+    """
+    start = time.perf_counter()
+    with Session(engine) as session:
+        known = {record.path: record for record in session.scalars(select(BronzeFile))}
+
+        pending = []
+        for path in find_bronze_files(directory):
+            stat = os.stat(path)
+            record = known.get(path)
+            if record and record.mtime == stat.st_mtime and record.size == stat.st_size:
+                continue
+            pending.append((path, stat))
+        logging.info(f"{len(pending)} new or changed bronze files in {directory}")
+
+        total = 0
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(
+                    load_bronze_file, path, known[path].sha256 if path in known else None
+                ): (path, stat)
+                for path, stat in pending
+            }
+            for future in as_completed(futures):
+                path, stat = futures[future]
+                try:
+                    sha256, adapter, df = future.result()
+                except ValueError as e:
+                    logging.warning(f"Skipping {path}: {e}")
+                    continue
+
+                record = known.get(path) or BronzeFile(path=path, sha256=sha256)
+                if df is not None:
+                    record.rows = upsert_dataframe(session, df)
+                    record.adapter = adapter
+                    total += record.rows
+                    logging.info(f"{path}: {record.rows} jobs ({adapter})")
+                record.sha256 = sha256
+                record.mtime = stat.st_mtime
+                record.size = stat.st_size
+                record.ingested_at = datetime.now()
+                session.add(record)
+                # One commit per file, so an interrupted run keeps what it loaded
+                session.commit()
 
+    log_rate(total, directory, start)
+    return total
 
-def create_jobs(csv_file="./data/bronze/marco_script/linkedin/head_of_product/jobs_Head_of_Product_-_European_Union_-_Remote_-_LinkedIn.csv"):
-    session = Session(engine)
-    df = pd.read_csv(csv_file)
-    job_json = df.to_dict(orient="records")
-    for job in job_json:
-        job_ingest = Job(**job)
-        session.add(job_ingest)
-    session.commit()
-        
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     create_db_and_tables()
-    create_jobs()
\ No newline at end of file
+    # python app/sqlingest.py [bronze directory or CSV file ...]
+    for source in sys.argv[1:] or [BRONZE_DIRECTORY]:
+        if os.path.isdir(source):
+            ingest_bronze(source)
+        else:
+            create_jobs(source)
@@ -0,0 +1,121 @@
+import logging
+import random
+import time
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import (
+    TimeoutException,
+    NoSuchElementException,
+    StaleElementReferenceException,
+)
+
+WAIT_TIMEOUT = 10
+POLL_FREQUENCY = 0.1
+SCROLL_STEP = 400  # pixels per step while sweeping the results list
+SCROLL_STEP_DELAY = 30  # milliseconds, lets occluded cards render as they pass
+
+
+class Pacing:
+    """A minimum pause plus random jitter, used where we wait on purpose."""
+
+    def __init__(self, floor, jitter=0.0):
+        self.floor = floor
+        self.jitter = jitter
+
+    def pause(self):
+        time.sleep(self.floor + random.uniform(0, self.jitter))
+
+
+# Rate-limit policy: these pauses are deliberate, everything else waits on the page
+CLICK_PACING = Pacing(floor=0.5, jitter=0.5)  # between two job clicks
+PAGE_PACING = Pacing(floor=2.0, jitter=2.0)  # between two result pages
+RETRY_PACING = Pacing(floor=0.25, jitter=0.25)  # before retrying a failed step
+
+
+def wait_for(driver, condition, timeout=WAIT_TIMEOUT):
+    """Wait until condition returns something truthy; return it, or None on timeout."""
+    try:
+        return WebDriverWait(
+            driver,
+            timeout,
+            poll_frequency=POLL_FREQUENCY,
+            ignored_exceptions=(NoSuchElementException, StaleElementReferenceException),
+        ).until(condition)
+    except TimeoutException:
+        return None
+
+
+def card_count_at_least(site, count):
+    def _predicate(driver):
+        cards = driver.find_elements(By.CLASS_NAME, site.job_list_item_class)
+        return cards if len(cards) >= count else False
+
+    return _predicate
+
+
+def card_count_grew(site, previous_count):
+    return card_count_at_least(site, previous_count + 1)
+
+
+def description_text(driver, site):
+    """The text in the detail pane, or None before the pane is rendered."""
+    try:
+        return driver.find_element(By.CLASS_NAME, site.description_class).text
+    except (NoSuchElementException, StaleElementReferenceException):
+        return None
+
+
+def description_changed(site, previous_text):
+    """The detail pane shows a non-empty description that differs from the last one."""
+
+    def _predicate(driver):
+        text = driver.find_element(By.CLASS_NAME, site.description_class).text
+        return text if text.strip() and text != previous_text else False
+
+    return _predicate
+
+
+def end_of_results_present(site):
+    def _predicate(driver):
+        return driver.find_elements(By.CLASS_NAME, site.end_of_results_list_class)
+
+    return _predicate
+
+
+def any_of(*conditions):
+    def _predicate(driver):
+        for condition in conditions:
+            result = condition(driver)
+            if result:
+                return result
+        return False
+
+    return _predicate
+
+
+SWEEP_SCRIPT = """
+const [list, step, delay, done] = arguments;
+let y = 0;
+function next() {
+    list.scrollTo(0, y);
+    if (y >= list.scrollHeight) {
+        done(list.scrollHeight);
+        return;
+    }
+    y += step;
+    setTimeout(next, delay);
+}
+next();
+"""
+
+
+def sweep_list(driver, element):
+    """Scroll through a lazily rendered list in one async script call."""
+    try:
+        return driver.execute_async_script(
+            SWEEP_SCRIPT, element, SCROLL_STEP, SCROLL_STEP_DELAY
+        )
+    except TimeoutException:
+        logging.warning("Scrolling the results list timed out")
+        return None
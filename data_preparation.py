@@ -1,15 +1,89 @@
 import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
 import re
-from nltk.tokenize import word_tokenize
-from nltk.stem import WordNetLemmatizer
-import nltk
-from nltk.corpus import stopwords
+import collections
 import functools
 import logging
-
-nltk.download("stopwords")
-nltk.download("wordnet")
+import numbers
+import os
+import pickle
+import subprocess
+import sys
+import time
+
+import numpy as np
+from scipy import sparse
+
+# nltk and scikit-learn take seconds to import and are only needed for text
+# processing and TF-IDF, so they are imported where they are used; DataLoader
+# users (and every batch worker process) do not pay for them.
+
+# NLTK data paths of the resources used here
+NLTK_RESOURCES = {
+    "stopwords": "corpora/stopwords",
+    "wordnet": "corpora/wordnet",
+    "punkt": "tokenizers/punkt",
+    "punkt_tab": "tokenizers/punkt_tab",
+}
+# With NLTK_OFFLINE=1 a missing resource raises at once instead of being downloaded
+NLTK_OFFLINE = os.getenv("NLTK_OFFLINE", "0") == "1"
+
+PUNCTUATION_RE = re.compile(r"[^a-z0-9\s-]")
+DIGITS_RE = re.compile(r"\d+")
+# Same result as PUNCTUATION_RE then DIGITS_RE: only ASCII digits survive the first
+NON_LETTER_RE = re.compile(r"[^a-z\s-]+")
+WHITESPACE_RE = re.compile(r"\s+")
+LEMMA_CACHE_SIZE = 100_000  # distinct words whose lemma is kept between calls
+
+
+@functools.lru_cache(maxsize=None)
+def ensure_nltk_resource(name):
+    """Check an NLTK resource is installed, downloading it (once per process) if not."""
+    import nltk
+
+    try:
+        nltk.data.find(NLTK_RESOURCES[name])
+        return
+    except LookupError:
+        if NLTK_OFFLINE:
+            raise LookupError(
+                f"NLTK resource {name!r} is not installed and NLTK_OFFLINE is set; "
+                f"run python -m nltk.downloader {name}"
+            ) from None
+    if not nltk.download(name, quiet=True):
+        raise LookupError(f"Could not download NLTK resource {name!r}")
+
+
+@functools.lru_cache(maxsize=None)
+def get_stop_words():
+    from nltk.corpus import stopwords
+
+    ensure_nltk_resource("stopwords")
+    return frozenset(stopwords.words("english"))
+
+
+@functools.lru_cache(maxsize=None)
+def get_lemmatizer():
+    from nltk.stem import WordNetLemmatizer
+
+    ensure_nltk_resource("wordnet")
+    return WordNetLemmatizer()
+
+
+@functools.lru_cache(maxsize=LEMMA_CACHE_SIZE)
+def lemmatize_word(word):
+    """Lemmatize one word. The cache is module-level, so every SkillDataProcessor
+    in the process shares it; the skill vocabulary is small next to the corpus."""
+    return get_lemmatizer().lemmatize(word)
+
+
+def word_tokenize(text):
+    from nltk import tokenize
+
+    # nltk >= 3.8.2 reads the punkt_tab tables, older releases the punkt pickles
+    ensure_nltk_resource(
+        "punkt_tab" if hasattr(tokenize, "_get_punkt_tokenizer") else "punkt"
+    )
+    return tokenize.word_tokenize(text)
 
 
 def handle_error(func):
@@ -32,9 +106,20 @@ class DataLoader:
         self.file_path = file_path
 
     @handle_error
-    def load_data(self) -> pd.DataFrame:
-        """Load data from a JSON file."""
-        data = pd.read_json(self.file_path)
+    def load_data(self, columns=None, filters=None) -> pd.DataFrame:
+        """Load data from a JSON file or a Parquet file/dataset directory.
+
+        For Parquet, only the requested columns are read and filters (e.g.
+        [("role", "=", "head_of_product")]) are pushed down to skip partitions and
+        row groups. Nested skills come back as {"skills": [...]}, as in the JSON.
+        """
+        if self.file_path.endswith(".json"):
+            data = pd.read_json(self.file_path)
+            return data[columns] if columns else data
+
+        data = pd.read_parquet(self.file_path, columns=columns, filters=filters)
+        if "skills" in data.columns:
+            data["skills"] = data["skills"].map(lambda x: {"skills": list(x)})
         return data
 
 
@@ -48,8 +133,15 @@ class TextProcessing:
         self.df = df
 
     @handle_error
-    def clean_text(self, df):
-        """Clean the 'skills' column of the DataFrame."""
+    def clean_text(self, df, vectorized=True):
+        """Clean the 'skills' column of the DataFrame.
+
+        The vectorized mode cleans all skill names as one flat Series; the
+        row-by-row mode is kept for reference and gives the same result.
+        """
+        if vectorized:
+            return self._clean_text_vectorized(df)
+
         for index, row in df.iterrows():
             skills = row["skills"]
             skill_list = skills["skills"]
@@ -60,11 +152,10 @@ class TextProcessing:
                 cleaned_name = name.lower()  # Lower case
                 skill["name"] = cleaned_name
 
-                clean_re = r"[^a-z0-9\s-]"
-                cleaned_name = re.sub(clean_re, "", cleaned_name)  # Remove punctuation
+                cleaned_name = PUNCTUATION_RE.sub("", cleaned_name)  # Remove punctuation
                 skill["name"] = cleaned_name
 
-                cleaned_name = re.sub(r"\d+", "", cleaned_name)  # Remove digits
+                cleaned_name = DIGITS_RE.sub("", cleaned_name)  # Remove digits
                 skill["name"] = cleaned_name
 
                 cleaned_name = cleaned_name = " ".join(
@@ -81,6 +172,23 @@ class TextProcessing:
             self.df.at[index, "skills"] = skills
         return df
 
+    def _clean_text_vectorized(self, df):
+        """Explode all skills into one Series, clean each distinct name once, write back."""
+        skills = df["skills"].map(lambda x: x["skills"]).explode().dropna()
+        codes, names = pd.factorize(skills.str.get("name"), use_na_sentinel=False)
+        cleaned = (
+            pd.Series(names, dtype=object)
+            .str.lower()  # Lower case
+            .str.replace(NON_LETTER_RE, "", regex=True)  # Remove punctuation and digits
+            .str.replace(WHITESPACE_RE, " ", regex=True)  # Collapse whitespace runs
+            .str.strip()  # Remove leading/trailing whitespace
+            .to_numpy()[codes]
+        )
+        # The skill dicts are shared with df, so this updates every row in place
+        for skill, name in zip(skills, cleaned):
+            skill["name"] = name
+        return df
+
     @handle_error
     def clean(self, df):
         """Perform full data cleaning by calling individual cleaning functions like clean_text()."""
@@ -155,26 +263,41 @@ class SkillDataProcessor:
             raise TypeError("Input data must be a Pandas DataFrame.")
         super().__init__()
         self.data = data
-        self.stop_words = set(stopwords.words("english"))
-        self.lemmatizer = WordNetLemmatizer()
+
+    # Loaded on first use, so a missing NLTK resource raises where it is needed
+    @property
+    def stop_words(self):
+        return get_stop_words()
+
+    @property
+    def lemmatizer(self):
+        return get_lemmatizer()
 
     def filter_stops(self, series: pd.Series) -> pd.Series:
         """Remove stopwords from a Pandas Series containing text."""
-        return series.apply(
-            lambda x: " ".join(
-                [word for word in x.split() if word not in self.stop_words]
-            )
+        return self._map_words(
+            series, lambda word: None if word in self.stop_words else word
         )
 
     def lemmatize_words(self, series: pd.Series) -> pd.Series:
-        """Lemmatize words in a Pandas Series using NLTK's WordNetLemmatizer."""
-
-        def lemmatize_text(text):
-            # Lemmatize the entire text as a single string
-            return " ".join(self.lemmatizer.lemmatize(word) for word in text.split())
-
-        # Apply lemmatization to each row in the series
-        return series.apply(lemmatize_text)
+        """Lemmatize words in a Pandas Series using NLTK's WordNetLemmatizer,
+        through the process-wide lemma cache of lemmatize_word."""
+        return self._map_words(series, lemmatize_word)
+
+    def _map_words(self, series: pd.Series, func) -> pd.Series:
+        """Split every row into words, apply func once per distinct word (None
+        drops the word) and join the rows back together."""
+        rows = [text.split() for text in series]
+        vocabulary = {word for words in rows for word in words}
+        mapping = {word: func(word) for word in vocabulary}
+        return pd.Series(
+            [
+                " ".join([word for word in map(mapping.get, words) if word is not None])
+                for words in rows
+            ],
+            index=series.index,
+            name=series.name,
+        )
 
     def normalize_and_encode_ascii(self, series: pd.Series) -> pd.Series:
         """Normalize and encode text to ASCII."""
@@ -185,25 +308,227 @@ class SkillDataProcessor:
         )
 
 
-def calculate_tfidf_scores(dataframe, text_column="unique_words", max_features=50):
-    """
-    Calculate TF-IDF scores for a given text column in a dataframe.
+class TfidfModel:
+    """TF-IDF over a growing corpus that is fitted once, saved, and reused.
+
+    Keeps the term and document counts, so partial_fit can add documents without
+    refitting. The vocabulary is chosen the way TfidfVectorizer chooses it: among
+    the terms within min_df/max_df, the max_features most frequent ones, with ties
+    resolved by the same argsort over the alphabetical terms. So the scores match
+    TfidfVectorizer with the same parameters fitted on the whole corpus.
+
+    Accepts TfidfVectorizer's analyzer parameters (lowercase, stop_words,
+    ngram_range, token_pattern, ...) and min_df, max_df, binary, norm, use_idf,
+    smooth_idf and sublinear_tf; vocabulary and dtype are not supported.
     """
-    # Initialize SkillDataProcessor and process the dataframe
+
+    WEIGHTING_DEFAULTS = {
+        "min_df": 1,
+        "max_df": 1.0,
+        "binary": False,
+        "norm": "l2",
+        "use_idf": True,
+        "smooth_idf": True,
+        "sublinear_tf": False,
+    }
+    UNSUPPORTED = ("vocabulary", "dtype")
+
+    def __init__(self, max_features=50, **vectorizer_kwargs):
+        unsupported = [name for name in self.UNSUPPORTED if name in vectorizer_kwargs]
+        if unsupported:
+            raise TypeError(f"TfidfModel does not support {', '.join(unsupported)}")
+        self.max_features = max_features
+        self.vectorizer_kwargs = vectorizer_kwargs
+        self.weighting = {
+            name: vectorizer_kwargs.get(name, default)
+            for name, default in self.WEIGHTING_DEFAULTS.items()
+        }
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        # Also rejects parameters TfidfVectorizer does not know
+        analyzer_kwargs = {
+            name: value
+            for name, value in vectorizer_kwargs.items()
+            if name not in self.WEIGHTING_DEFAULTS
+        }
+        self.analyzer = TfidfVectorizer(**analyzer_kwargs).build_analyzer()
+        self.n_documents = 0
+        self.term_counts = collections.Counter()
+        self.document_counts = collections.Counter()
+        self.vocabulary = {}
+        self.idf = np.empty(0)
+
+    def fit(self, documents):
+        self.n_documents = 0
+        self.term_counts.clear()
+        self.document_counts.clear()
+        return self.partial_fit(documents)
+
+    def _document_count_limit(self, name):
+        limit = self.weighting[name]
+        if isinstance(limit, numbers.Integral):
+            return limit
+        return limit * self.n_documents
+
+    def partial_fit(self, documents):
+        """Add documents to the corpus statistics and update the vocabulary and idf."""
+        for document in documents:
+            terms = self.analyzer(document)
+            if self.weighting["binary"]:
+                terms = set(terms)
+            self.term_counts.update(terms)
+            self.document_counts.update(set(terms))
+            self.n_documents += 1
+
+        # TfidfVectorizer._limit_features on the alphabetically sorted terms
+        terms = np.array(sorted(self.term_counts), dtype=object)
+        document_counts = np.array(
+            [self.document_counts[term] for term in terms], dtype=np.int64
+        )
+        min_count = self._document_count_limit("min_df")
+        max_count = self._document_count_limit("max_df")
+        if max_count < min_count:
+            raise ValueError("max_df corresponds to < documents than min_df")
+        mask = (document_counts >= min_count) & (document_counts <= max_count)
+        if self.max_features is not None and mask.sum() > self.max_features:
+            term_counts = np.array([self.term_counts[term] for term in terms])
+            kept = (-term_counts[mask]).argsort()[: self.max_features]
+            limited = np.zeros(len(terms), dtype=bool)
+            limited[np.where(mask)[0][kept]] = True
+            mask = limited
+        if len(terms) and not mask.any():
+            raise ValueError(
+                "After pruning, no terms remain. Try a lower min_df or a higher max_df."
+            )
+
+        terms, document_counts = terms[mask], document_counts[mask].astype(np.float64)
+        self.vocabulary = {term: column for column, term in enumerate(terms)}
+        if self.weighting["smooth_idf"]:
+            self.idf = np.log((1 + self.n_documents) / (1 + document_counts)) + 1
+        else:
+            self.idf = np.log(self.n_documents / document_counts) + 1
+        return self
+
+    def transform(self, documents, dense=False):
+        """TF-IDF rows for documents as a sparse CSR matrix, or an array if dense."""
+        from sklearn.preprocessing import normalize
+
+        documents = list(documents)
+        rows, columns, values = [], [], []
+        for row, document in enumerate(documents):
+            counts = collections.Counter(
+                term for term in self.analyzer(document) if term in self.vocabulary
+            )
+            rows.extend([row] * len(counts))
+            columns.extend(self.vocabulary[term] for term in counts)
+            values.extend(counts.values())
+        values = np.array(values, dtype=np.float64)
+        if self.weighting["binary"]:
+            values[:] = 1
+        elif self.weighting["sublinear_tf"]:
+            values = np.log(values) + 1
+        matrix = sparse.csr_matrix(
+            (values, (rows, columns)),
+            shape=(len(documents), len(self.vocabulary)),
+            dtype=np.float64,
+        )
+        if self.weighting["use_idf"]:
+            matrix = sparse.csr_matrix(matrix @ sparse.diags(self.idf))
+        if self.weighting["norm"]:
+            matrix = normalize(matrix, norm=self.weighting["norm"])
+        return matrix.toarray() if dense else matrix
+
+    def fit_transform(self, documents, dense=False):
+        documents = list(documents)
+        return self.fit(documents).transform(documents, dense=dense)
+
+    def get_feature_names_out(self):
+        return np.array(sorted(self.vocabulary, key=self.vocabulary.get), dtype=object)
+
+    def to_frame(self, matrix, index=None):
+        """Label a transform() result with the terms, keeping it sparse if it is."""
+        columns = self.get_feature_names_out()
+        if sparse.issparse(matrix):
+            return pd.DataFrame.sparse.from_spmatrix(
+                matrix, index=index, columns=columns
+            )
+        return pd.DataFrame(matrix, index=index, columns=columns)
+
+    def save(self, path):
+        state = {
+            "max_features": self.max_features,
+            "vectorizer_kwargs": self.vectorizer_kwargs,
+            "n_documents": self.n_documents,
+            "term_counts": self.term_counts,
+            "document_counts": self.document_counts,
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as file:
+            pickle.dump(state, file)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as file:
+            state = pickle.load(file)
+        model = cls(state["max_features"], **state["vectorizer_kwargs"])
+        model.n_documents = state["n_documents"]
+        model.term_counts = state["term_counts"]
+        model.document_counts = state["document_counts"]
+        return model.partial_fit([])
+
+
+def prepare_tfidf_documents(dataframe, text_column="unique_words"):
+    """Stopword filtering, lemmatization and ASCII folding ahead of TF-IDF."""
     skill_processor = SkillDataProcessor(dataframe)
     processed_dataframe = skill_processor.filter_stops(dataframe[text_column])
     processed_dataframe = skill_processor.lemmatize_words(processed_dataframe)
     processed_dataframe = skill_processor.normalize_and_encode_ascii(
         processed_dataframe
     )
-    # Extract the text data from the specified column
-    documents = processed_dataframe.tolist()
-    # Create a TF-IDF vectorizer with a specified maximum number of features and remove stopwords
-    tfidf_vectorizer = TfidfVectorizer(max_features=max_features)
-    # Create TF-IDF matrix
-    tfidf_matrix = tfidf_vectorizer.fit_transform(documents)
+    return processed_dataframe.tolist()
+
+
+def calculate_tfidf_scores(
+    dataframe, text_column="unique_words", max_features=50, model=None, dense=False
+):
+    """
+    Calculate TF-IDF scores for a given text column in a dataframe.
+
+    Without a model a new TfidfModel is fitted on the column; with one (e.g.
+    TfidfModel.load(path)) the rows are scored against its corpus without refitting.
+    The scores are a sparse DataFrame unless dense is set.
+    """
+    documents = prepare_tfidf_documents(dataframe, text_column)
+    if model is None:
+        model = TfidfModel(max_features=max_features).fit(documents)
+    tfidf_matrix = model.transform(documents, dense=dense)
     # Create a dataframe with TF-IDF scores and term names
-    tfidf_scores = pd.DataFrame(
-        tfidf_matrix.toarray(), columns=tfidf_vectorizer.get_feature_names_out()
-    )
-    return tfidf_scores
+    return model.to_frame(tfidf_matrix)
+
+
+def benchmark_import(runs=5):
+    """Median seconds for a fresh interpreter to import this module, next to the
+    pandas import alone as the floor."""
+    directory = os.path.dirname(os.path.abspath(__file__))
+
+    def median_import_time(statement):
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "-c", statement], cwd=directory, check=True)
+            times.append(time.perf_counter() - start)
+        return sorted(times)[len(times) // 2]
+
+    return {
+        "python": median_import_time("pass"),
+        "pandas": median_import_time("import pandas"),
+        "data_preparation": median_import_time("import data_preparation"),
+    }
+
+
+if __name__ == "__main__":
+    # python data_preparation.py [runs]: import time benchmark
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    for name, seconds in benchmark_import(runs).items():
+        print(f"{name:>16}: {seconds * 1000:.0f} ms")
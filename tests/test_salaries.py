@@ -0,0 +1,33 @@
+import pandas as pd
+
+from salaries import parse_salaries
+
+
+def test_plain_single_value_is_both_min_and_max():
+    parsed = parse_salaries(pd.Series(["$140,000 a year", "$70 an hour"]))
+    assert parsed["salary_min"].tolist() == [140000, 70]
+    assert parsed["salary_max"].tolist() == [140000, 70]
+    assert parsed["salary_annual_min"].tolist() == [140000, 70 * 2080]
+    assert parsed["salary_annual_max"].tolist() == [140000, 70 * 2080]
+
+
+def test_bounds_and_ranges():
+    parsed = parse_salaries(
+        pd.Series(
+            ["Up to $85,000 a year", "From $50 an hour", "$65 - $70 an hour", None]
+        )
+    )
+    assert pd.isna(parsed.loc[0, "salary_min"]) and parsed.loc[0, "salary_max"] == 85000
+    assert parsed.loc[1, "salary_min"] == 50 and pd.isna(parsed.loc[1, "salary_max"])
+    assert parsed.loc[2, ["salary_min", "salary_max"]].tolist() == [65, 70]
+    assert parsed.loc[3].isna().all()
+
+
+def test_linkedin_ranges_with_a_period_per_amount():
+    parsed = parse_salaries(
+        pd.Series(["$120K/yr - $150K/yr", "$120k/yr - $150k/yr", "$45/hr - $55/hr"])
+    )
+    assert parsed["salary_min"].tolist() == [120000, 120000, 45]
+    assert parsed["salary_max"].tolist() == [150000, 150000, 55]
+    assert parsed["salary_period"].tolist() == ["year", "year", "hour"]
+    assert parsed["salary_annual_max"].tolist() == [150000, 150000, 55 * 2080]